@@ -1,8 +1,10 @@
+import io
 import os
 import sys
 import warnings
 import matplotlib.pyplot as plt
 import numpy as np
+import shutil
 import tempfile
 from videometer import vm_utils as utils
 from videometer import config
@@ -15,7 +17,9 @@ class ImageClass:
     'clr' and 'python' backends for reading and writing files.
 
     Attributes:
-        PixelValues (np.ndarray): 3-D NumPy array of pixel values (height, width, bands).
+        PixelValues (np.ndarray): 3-D NumPy array of pixel values (height, width, bands),
+            or (bands, height, width) if the image was read with layout="bhw". If the
+            image was read with lazy=True, the pixels are decoded on first access.
         Height (int): Image height.
         Width (int): Image width.
         Bands (int): Number of spectral bands.
@@ -43,15 +47,29 @@ class ImageClass:
         bandIndexesToUse=[],
         ifSkipReadingAllLayers=False,
         ifSkipReadingFreehandLayer=False,
+        layout="hwb",
+        lazy=False,
+        dtype=np.float32,
     ):
         """Initializes an ImageClass object by reading a HIPS file.
 
         Args:
-            path (str): Path to the .hips file.
+            path (str): Path to the .hips file. With the 'python' backend this can
+                also be the contents of a HIPS file (bytes, bytearray or memoryview).
             bandIndexesToUse (List[int], optional): Bands to load.
             ifSkipReadingAllLayers (bool, optional): Skip metadata masks.
             ifSkipReadingFreehandLayer (bool, optional): Skip freehand layers.
+            layout (str, optional): "hwb" for (height, width, bands) PixelValues or
+                "bhw" for a contiguous (bands, height, width) cube.
+            lazy (bool, optional): Only read the header now and decode PixelValues on
+                first access ('python' backend only).
+            dtype (np.dtype, optional): dtype of PixelValues. None keeps the dtype the
+                backend decodes to. Defaults to np.float32.
         """
+        if layout not in ("hwb", "bhw"):
+            raise ValueError("layout needs to be either 'hwb' or 'bhw'")
+
+        self._lazyHipsImage = None
         self.PixelValues = None
         self.Height = 0
         self.Width = 0
@@ -78,11 +96,28 @@ class ImageClass:
         
         self._BandCompressionModeObject = None
         self._QuantizationParametersObject = None
+        self._layout = layout
+        self._dtype = dtype
 
         if config.get_backend() == "clr":
+            if lazy:
+                warnings.warn("lazy is only supported by the python backend and is ignored.")
             self._init_clr(path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer)
         else:
-            self._init_python(path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer)
+            self._init_python(path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer, lazy)
+
+    @property
+    def PixelValues(self):
+        """np.ndarray: The pixel values, decoded on first access if read with lazy=True."""
+        if self._lazyHipsImage is not None:
+            self._pixelValues = _loadPixelsAs(self._lazyHipsImage, self._dtype)
+            self._lazyHipsImage = None
+        return self._pixelValues
+
+    @PixelValues.setter
+    def PixelValues(self, value):
+        self._lazyHipsImage = None
+        self._pixelValues = value
 
     def _init_clr(self, path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer):
         from videometer import vm_utils_clr
@@ -91,11 +126,19 @@ class ImageClass:
         import clr
         
         VMImageObject = VMImIO.HipsIO.LoadImage(path)
-        self.PixelValues = vm_utils_clr.vmImage2npArray(VMImageObject)
-
-        (self.Height, self.Width, self.Bands) = self.PixelValues.shape
-
         self.Bands = int(VMImageObject.Bands)
+        if len(bandIndexesToUse) != 0:
+            utils.checkIfbandIndexesToUseIsValid(bandIndexesToUse, self.Bands)
+            # Only the kept bands are copied out of the VMImage
+            self.PixelValues = vm_utils_clr.vmImage2npArray(
+                VMImageObject, bandIndexesToUse, self._layout, self._dtype
+            )
+        else:
+            self.PixelValues = vm_utils_clr.vmImage2npArray(
+                VMImageObject, layout=self._layout, dtype=self._dtype
+            )
+
+        (self.Height, self.Width, _) = self._hwbPixelValues().shape
         self.BandNames = np.array(
             [str(bandname) for bandname in VMImageObject.BandNames]
         )
@@ -127,13 +170,25 @@ class ImageClass:
             self._ReadAllImageLayers_clr(VMImageObject, ifSkipReadingFreehandLayer)
 
         if len(bandIndexesToUse) != 0:
-            self.reduceBands(bandIndexesToUse)
+            self._reduceBandsMetaData(bandIndexesToUse)
 
-    def _init_python(self, path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer):
+    def _init_python(self, path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer, lazy=False):
         from videometer.hips_core import HipsImage
         
-        img = HipsImage.read(path)
-        self.PixelValues = img.pixels
+        is_buffer = isinstance(path, (bytes, bytearray, memoryview))
+        if is_buffer:
+            img = HipsImage.from_buffer(path, layout=self._layout)
+        else:
+            img = HipsImage.read(path, layout=self._layout)
+        if len(bandIndexesToUse) != 0:
+            # Reduce before touching the pixels so only the kept bands are decoded
+            utils.checkIfbandIndexesToUseIsValid(bandIndexesToUse, img.bands)
+            img.reduce_bands(list(bandIndexesToUse))
+        if lazy:
+            # Only the header has been parsed; the PixelValues property decodes the pixels
+            self._lazyHipsImage = img
+        else:
+            self.PixelValues = _loadPixelsAs(img, self._dtype)
         self.Height = img.height
         self.Width = img.width
         self.Bands = img.bands
@@ -146,8 +201,9 @@ class ImageClass:
         self.MmPixel = img.mm_pixel
         self.History = img.history
         self.Description = img.description
-        self.ImageFileName = os.path.basename(path)
-        self.FullPathToImage = os.path.abspath(path)
+        if not is_buffer:
+            self.ImageFileName = os.path.basename(path)
+            self.FullPathToImage = os.path.abspath(path)
         
         self.ExtraData = img.extra_data.copy()
         self.ExtraDataInt = img.extra_data_int.copy()
@@ -164,9 +220,6 @@ class ImageClass:
              # but we can at least handle what it has
              pass
 
-        if len(bandIndexesToUse) != 0:
-            self.reduceBands(bandIndexesToUse)
-
     def _ReadAllImageLayers_clr(self, VMImageObject, ifSkipReadingFreehandLayer):
         from videometer import vm_utils_clr
         import VM.Image as VMIm
@@ -266,28 +319,14 @@ class ImageClass:
         -----------
         spectraName - string
             Name of the spectra to be used in the sRGB conversion. Default
-            spectraName is 'D65'.
+            spectraName is 'D65'. The 'python' backend renders with
+            `videometer.srgb` and supports the illuminants in
+            `srgb.SPECTRA_NAMES` ('A', 'D50', 'D55', 'D65', 'D75', 'E').
         useMask - boool
             Whether to apply the foreground mask
         Output :
             returns the sRGB image and updates the "RGBPixels" attribute"""
 
-        if config.get_backend() == "python":
-            # hips_core doesn't have to_sRGB yet.
-            raise NotImplementedError("to_sRGB is not yet implemented for the 'python' backend.")
-
-        from videometer import vm_utils_clr
-        import VM.Image.ViewTransforms as VMImTransForms
-        
-        SpectraNamesLUT = vm_utils_clr.get_SpectraNamesLUP()
-        if not (spectraName in SpectraNamesLUT):
-            raise NotImplementedError(
-                'spectraName="'
-                + spectraName
-                + '" is not implemented. \nList of implemented spectras: '
-                + str(list(SpectraNamesLUT.keys()))
-            )
-
         # Take only the wavelengths with the right illumination
 
         allowableIlluminations = [
@@ -299,7 +338,7 @@ class ImageClass:
 
         diffusedMask = np.isin(self.Illumination, allowableIlluminations)
 
-        # Create a new VM object to parse through the SRGBViewTransform with only the visable wavelengths
+        # Only the visible wavelengths are used in the sRGB conversion
         visibleMask = (380 <= self.WaveLengths) * (self.WaveLengths <= 780)
 
         visibleBands = diffusedMask & visibleMask
@@ -309,7 +348,56 @@ class ImageClass:
                 "Image class needs to have 3 or more wavelengths on the visable spectrum (380mm <= wavelength <= 780mm). Number of visable wavelength in ImageClass : "
                 + str(np.sum(visibleBands))
             )
-        VMImageObject = vm_utils_clr.npArray2VMImage(self.PixelValues[:, :, visibleBands])
+
+        if config.get_backend() == "python":
+            from videometer import srgb
+
+            if not (spectraName in srgb.SPECTRA_NAMES):
+                raise NotImplementedError(
+                    'spectraName="'
+                    + spectraName
+                    + '" is not implemented. \nList of implemented spectras: '
+                    + str(list(srgb.SPECTRA_NAMES))
+                )
+            srgbImage = srgb.spectral_to_srgb(
+                self._hwbPixelValues()[:, :, visibleBands],
+                self.WaveLengths[visibleBands],
+                spectraName,
+            )
+        else:
+            srgbImage = self._to_sRGB_clr(spectraName, visibleBands)
+
+        imrgb = np.empty_like(srgbImage)
+        if useMask:
+            if self.ForegroundPixels is None:
+                raise AttributeError("ForegroundPixels attribute not set")
+                
+            for i in range(3):
+                imrgb[:, :, i] = np.multiply(
+                    srgbImage[:, :, i], self.ForegroundPixels
+                )
+        else:
+            imrgb = srgbImage
+        self.RGBPixels = imrgb
+
+        return imrgb
+
+    def _to_sRGB_clr(self, spectraName, visibleBands):
+        """Renders the given bands with the CLR SrgbViewTransform."""
+        from videometer import vm_utils_clr
+        import VM.Image.ViewTransforms as VMImTransForms
+        
+        SpectraNamesLUT = vm_utils_clr.get_SpectraNamesLUP()
+        if not (spectraName in SpectraNamesLUT):
+            raise NotImplementedError(
+                'spectraName="'
+                + spectraName
+                + '" is not implemented. \nList of implemented spectras: '
+                + str(list(SpectraNamesLUT.keys()))
+            )
+
+        # Create a new VM object to parse through the SRGBViewTransform with only the visable wavelengths
+        VMImageObject = vm_utils_clr.npArray2VMImage(self._hwbPixelValues()[:, :, visibleBands])
 
         # Add attributes that are checked in IsValidFor()
         VMImageObject.AddToHistory(self.History)
@@ -328,22 +416,9 @@ class ImageClass:
         bitmap = converter.GetBitmap(VMImageObject, SpectraNamesLUT[spectraName])
         srgbImage = vm_utils_clr.systemDrawingBitmap2npArray(bitmap).astype(np.uint8)
 
-        imrgb = np.empty_like(srgbImage)
-        if useMask:
-            if self.ForegroundPixels is None:
-                raise AttributeError("ForegroundPixels attribute not set")
-                
-            for i in range(3):
-                imrgb[:, :, i] = np.multiply(
-                    srgbImage[:, :, i], self.ForegroundPixels
-                )
-        else:
-            imrgb = srgbImage
-        self.RGBPixels = imrgb
-
         VMImageObject.Free()
 
-        return imrgb
+        return srgbImage
 
     def reduceBands(self, bandIndexesToUse):
         """Reduces bands of the image.
@@ -369,7 +444,23 @@ class ImageClass:
         """
 
         utils.checkIfbandIndexesToUseIsValid(bandIndexesToUse, self.Bands)
-        self.PixelValues = self.PixelValues[:, :, bandIndexesToUse]
+        if self._lazyHipsImage is not None:
+            # Pixels not decoded yet: reduce the pending image so only the kept bands are decoded later
+            self._lazyHipsImage.reduce_bands(list(bandIndexesToUse))
+            self._reduceBandsMetaData(bandIndexesToUse)
+            return
+        if self._layout == "bhw":
+            self.PixelValues = self.PixelValues[bandIndexesToUse]
+        else:
+            self.PixelValues = self.PixelValues[:, :, bandIndexesToUse]
+        self._reduceBandsMetaData(bandIndexesToUse)
+
+        if config.get_backend() == "python":
+            if hasattr(self, '_python_hips_image'):
+                self._python_hips_image.reduce_bands(list(bandIndexesToUse))
+
+    def _reduceBandsMetaData(self, bandIndexesToUse):
+        """Reduces the per-band metadata to the given bands, leaving PixelValues untouched."""
         self.Bands = len(bandIndexesToUse)
         self.BandNames = self.BandNames[bandIndexesToUse]
         self.WaveLengths = self.WaveLengths[bandIndexesToUse]
@@ -388,12 +479,84 @@ class ImageClass:
             for i, bandIndexToUse in enumerate(bandIndexesToUse):
                 tmp[i] = self._QuantizationParametersObject[bandIndexToUse]
             self._QuantizationParametersObject = tmp
+
+    def _hwbPixelValues(self):
+        """Returns PixelValues as a (height, width, bands) array, as a view if read with layout="bhw"."""
+        if self._layout == "bhw":
+            return self.PixelValues.transpose(1, 2, 0)
+        return self.PixelValues
+
+    def foreground_pixels_table(self, mask=None, bandIndexesToUse=None):
+        """Extracts the foreground pixels as a compact (pixels, bands) table.
+
+        Pixel-level models usually only need the foreground, which on blob images is a
+        small part of the frame. The table is gathered with a single boolean index; on an
+        image read with lazy=True it is built band by band from the file instead, without
+        decoding the full cube.
+
+        Args:
+            mask (np.ndarray, optional): (height, width) mask of the pixels to keep.
+                Defaults to ForegroundPixels.
+            bandIndexesToUse (List[int], optional): Bands to extract. If None, all bands
+                are used.
+
+        Returns:
+            tuple: A C-contiguous (N, bands) array with one row per foreground pixel in
+            row-major order, and an (N, 2) array with the (row, column) of each row.
+
+        Raises:
+            ValueError: If no mask is given and the image has no ForegroundPixels, or if
+                the mask does not match the image size.
+        """
+        if mask is None:
+            mask = self.ForegroundPixels
+        if mask is None:
+            raise ValueError("The image has no ForegroundPixels, so a mask needs to be given")
+        if bandIndexesToUse is not None:
+            utils.checkIfbandIndexesToUseIsValid(bandIndexesToUse, self.Bands)
+        if self._lazyHipsImage is not None:
+            table, coordinates = self._lazyHipsImage.foreground_pixels_table(mask, bandIndexesToUse)
+            if self._dtype is not None:
+                table = table.astype(self._dtype, copy=False)
+            return table, coordinates
+
+        mask = np.asarray(mask)
+        if mask.shape != (self.Height, self.Width):
+            raise ValueError(
+                "Mask " + str(mask.shape) + " and PixelValues " + str((self.Height, self.Width))
+                + " shape do not match"
+            )
+        mask = mask.astype(bool, copy=False)
+        if self._layout == "bhw":
+            table = self.PixelValues[:, mask]
+            if bandIndexesToUse is not None:
+                table = table[bandIndexesToUse]
+            table = np.ascontiguousarray(table.T)
         else:
-            if hasattr(self, '_python_hips_image'):
-                self._python_hips_image.reduce_bands(list(bandIndexesToUse))
+            table = self.PixelValues[mask]
+            if bandIndexesToUse is not None:
+                table = table[:, bandIndexesToUse]
+        return table, np.argwhere(mask)
+
+    def to_bytes(self, compression="SameAsImageClass") -> bytes:
+        """Encodes the image as the contents of a HIPS file, e.g. to store it as a blob.
+
+        Args:
+            compression (str, optional): Compression preset. See `write`.
+
+        Returns:
+            bytes: The encoded HIPS file.
+        """
+        buf = io.BytesIO()
+        write(self, buf, compression)
+        return buf.getvalue()
 
     @staticmethod
     def from_bytes(bytes) -> "ImageClass":
+        if config.get_backend() == "python":
+            # The pure Python reader parses the blob in memory; no temporary file needed
+            return ImageClass(bytes)
+
         # Create a temporary file. 
         # delete=False is required so the file persists for the caller to use.
         with tempfile.NamedTemporaryFile(delete_on_close=False, suffix='.hips', mode='wb') as tmp_file:
@@ -411,6 +574,9 @@ def read(
     bandIndexesToUse=[],
     ifSkipReadingAllLayers=False,
     ifSkipReadingFreehandLayer=False,
+    layout="hwb",
+    lazy=False,
+    dtype=np.float32,
 ):
     """Reads a HIPS image and stores it as an ImageClass object.
 
@@ -422,6 +588,18 @@ def read(
             like CorrectedPixels, DeadPixels, etc. Defaults to False.
         ifSkipReadingFreehandLayer (bool, optional): If True, skip reading Freehand layers.
             Defaults to False.
+        layout (str, optional): Memory layout of PixelValues. "hwb" gives the usual
+            (height, width, bands) array; "bhw" gives a contiguous (bands, height, width)
+            cube so that every band is one contiguous block. Defaults to "hwb".
+        lazy (bool, optional): If True, only the header is read and PixelValues is
+            decoded on first access, so reading metadata such as WaveLengths or
+            ExtraData costs about as much as parsing the header. The file must stay in
+            place until then. Only supported by the 'python' backend. Defaults to False.
+        dtype (np.dtype, optional): dtype of PixelValues. The pixels are converted once,
+            while they are decoded, rather than in a separate copy. None keeps the dtype
+            the backend decodes to (the stored dtype with the 'python' backend).
+            Integer dtypes truncate the decoded values, also for quantized files.
+            Defaults to np.float32.
 
     Returns:
         ImageClass: An initialized ImageClass object.
@@ -440,24 +618,174 @@ def read(
         raise FileNotFoundError("Couldn't locate " + path)
 
     return ImageClass(
-        path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer
+        path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer, layout, lazy, dtype
     )
 
 
-def write(image, path, compression="SameAsImageClass", verbose=False):
+def read_many(
+    paths,
+    bandIndexesToUse=[],
+    workers=None,
+    executor="thread",
+    stack=False,
+    ifSkipReadingAllLayers=False,
+    ifSkipReadingFreehandLayer=False,
+    layout="hwb",
+    dtype=np.float32,
+):
+    """Reads many HIPS images, optionally in parallel, in the order they are given.
+
+    A file that cannot be read does not stop the batch: its error is returned in place
+    of its result, so one corrupt image in a plate series only costs that image.
+
+    Args:
+        paths (List[str]): Full paths to the .hips images.
+        bandIndexesToUse (List[int], optional): List of band indexes to read from every
+            image. If empty, all bands are read.
+        workers (int, optional): Number of images read at the same time. None or 1
+            reads them one after the other in the calling thread.
+        executor (str, optional): "thread" reads in a thread pool, which suits the
+            python backend since decompression releases the GIL. "process" reads in a
+            process pool; every worker selects the current backend (and loads the .NET
+            runtime for 'clr') once when it starts. Defaults to "thread".
+        stack (bool, optional): If True, only the pixel values are read and copied into
+            one preallocated (N, height, width, bands) array ((N, bands, height, width)
+            for layout "bhw"). The shape is taken from the first image that can be read;
+            images with another shape are reported as errors. Defaults to False.
+        ifSkipReadingAllLayers (bool, optional): If True, skip reading metadata layers
+            like CorrectedPixels, DeadPixels, etc. Defaults to False.
+        ifSkipReadingFreehandLayer (bool, optional): If True, skip reading Freehand layers.
+            Defaults to False.
+        layout (str, optional): "hwb" or "bhw", see `read`. Defaults to "hwb".
+        dtype (np.dtype, optional): dtype of the pixel values, see `read`. Defaults to
+            np.float32.
+
+    Returns:
+        tuple: (results, errors). With stack=False, results is a list with an ImageClass
+        per path (None where reading failed). With stack=True, it is the stacked pixel
+        array in `dtype` (the first image's dtype if dtype is None), whose rows for failed
+        images are zero (or None if no image could be read).
+        errors is a list with None per path that was read and the raised exception
+        otherwise. With executor "process" and the 'clr' backend, the images carry no
+        .NET compression settings, so 'SameAsImageClass' writes them uncompressed.
+
+    Raises:
+        ValueError: If executor is neither "thread" nor "process".
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError("executor needs to be either 'thread' or 'process'")
+    paths = list(paths)
+    readArgs = (list(bandIndexesToUse), ifSkipReadingAllLayers, ifSkipReadingFreehandLayer, layout, dtype, stack)
+
+    if workers is None or workers <= 1 or len(paths) <= 1:
+        outcomes = (_read_many_one(path, readArgs) for path in paths)
+        return _collect_read_many(outcomes, len(paths), stack)
+
+    import functools
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from videometer.hips_core import _bounded_map
+
+    workers = min(workers, len(paths))
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_read_many_worker, initargs=(config.get_backend(),)
+        )
+    with pool:
+        # A bounded window keeps at most a few decoded images waiting to be collected
+        outcomes = _bounded_map(pool, functools.partial(_read_many_one, readArgs=readArgs), paths, 2 * workers)
+        return _collect_read_many(outcomes, len(paths), stack)
+
+
+def _init_read_many_worker(backend):
+    config.set_backend(backend)
+    if backend == "clr":
+        # Loads the .NET runtime and the VM assemblies once per worker process
+        from videometer import vm_utils_clr  # noqa: F401
+    globals()["_inReadManyWorkerProcess"] = True
+
+
+_inReadManyWorkerProcess = False
+
+
+def _read_many_one(path, readArgs):
+    """Reads one image for `read_many`; returns (result, None) or (None, exception)."""
+    bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer, layout, dtype, stack = readArgs
+    try:
+        if stack:
+            image = read(path, bandIndexesToUse, True, True, layout, dtype=dtype)
+            return image.PixelValues, None
+        image = read(
+            path, bandIndexesToUse, ifSkipReadingAllLayers, ifSkipReadingFreehandLayer, layout, dtype=dtype
+        )
+        if _inReadManyWorkerProcess:
+            # .NET objects cannot be sent back to the parent process
+            image._BandCompressionModeObject = None
+            image._QuantizationParametersObject = None
+        return image, None
+    except Exception as e:
+        return None, e
+
+
+def _collect_read_many(outcomes, count, stack):
+    errors = [None] * count
+    if not stack:
+        results = [None] * count
+        for i, (result, error) in enumerate(outcomes):
+            results[i] = result
+            errors[i] = error
+        return results, errors
+
+    stacked = None
+    failed = np.zeros(count, dtype=bool)
+    for i, (cube, error) in enumerate(outcomes):
+        if error is None and stacked is None:
+            # The cubes already are in the requested dtype (see _read_many_one)
+            stacked = np.empty((count,) + cube.shape, dtype=cube.dtype)
+        if error is None and cube.shape != stacked.shape[1:]:
+            error = ValueError(
+                "Image shape " + str(cube.shape) + " does not match the stacked shape "
+                + str(stacked.shape[1:])
+            )
+        if error is None:
+            stacked[i] = cube
+        else:
+            errors[i] = error
+            failed[i] = True
+    if stacked is not None:
+        stacked[failed] = 0
+    return stacked, errors
+
+
+def write(image, path, compression="SameAsImageClass", verbose=False, profile=None, auto_range=None):
     """Writes a HIPS image from an ImageClass object or a NumPy array.
 
     Args:
         image (ImageClass or np.ndarray): The image data to write.
-        path (str): Target file path (must end in .hips).
+        path (str or file object): Target file path (must end in .hips), or a writable
+            binary file object such as a BytesIO. The clr backend can only save to a
+            path, so it writes a temporary file and copies it into the file object.
         compression (str, optional): Compression level. One of:
             'SameAsImageClass', 'Uncompressed', 'VeryHighQuality',
             'HighQuality', 'HighCompression', 'VeryHighCompression'.
-            Defaults to 'SameAsImageClass'.
+            Defaults to 'SameAsImageClass'. With the python backend,
+            'SameAsImageClass' stores uint8, int16, int32, float32 and float64 pixels
+            in their own dtype (PFBYTE, PFSHORT, PFINT, PFFLOAT, PFDOUBLE).
         verbose (bool, optional): If True, print status messages. Defaults to False.
+        profile (str or dict, optional): Encoder speed/size trade-off, python backend
+            only: "fast", "small", or a dict with "compress_level" (0-9) and/or
+            "strategy" (a zlib strategy constant). Ignored with a warning by the clr
+            backend. Defaults to None (the encoder defaults).
+        auto_range (bool or tuple, optional): Fit the quantization range of every band
+            to its values instead of the preset's fixed 0-120 range, python backend
+            only: True for the band minimum and maximum, or a (low, high) pair of
+            percentiles such as (0.1, 99.9). Ignored with a warning by the clr backend.
+            Defaults to None.
 
     Returns:
-        str: Absolute path to the written file if successful, else None.
+        str: Absolute path to the written file if successful, else None. When writing
+        to a file object, the file object is returned instead of a path.
 
     Raises:
         TypeError: If path doesn't end in .hips or image type is invalid.
@@ -465,28 +793,36 @@ def write(image, path, compression="SameAsImageClass", verbose=False):
         ValueError: If layer dimensions don't match pixel data.
     """
 
-    if not (path.endswith(".hips")):
-        raise TypeError("File needs to contain the .hips extension :" + path)
-    folderPath = os.path.dirname(os.path.abspath(path))
-    if not (os.path.isdir(folderPath)):
-        raise FileNotFoundError(
-            "The folder structure not found under " + path + " : " + folderPath
-        )
+    isStream = hasattr(path, "write")
+    if not isStream:
+        if not (path.endswith(".hips")):
+            raise TypeError("File needs to contain the .hips extension :" + path)
+        folderPath = os.path.dirname(os.path.abspath(path))
+        if not (os.path.isdir(folderPath)):
+            raise FileNotFoundError(
+                "The folder structure not found under " + path + " : " + folderPath
+            )
 
     if config.get_backend() == "python":
-        return _write_python(image, path, compression, verbose)
+        return _write_python(image, path, compression, verbose, profile, auto_range)
     else:
+        if profile is not None:
+            warnings.warn("The compression profile is only supported by the python backend and is ignored.")
+        if auto_range:
+            warnings.warn("auto_range is only supported by the python backend and is ignored.")
+        if isStream:
+            return _write_clr_to_stream(image, path, compression, verbose)
         return _write_clr(image, path, compression, verbose)
 
-def _write_python(image, path, compression, verbose):
-    from videometer.hips_core import HipsImage, COMPRESSION_PRESETS
+def _write_python(image, path, compression, verbose, profile=None, auto_range=None):
+    from videometer.hips_core import HipsImage, HipsFormat
     
     if isinstance(image, np.ndarray):
         img_obj = HipsImage()
         img_obj.pixels = image
     elif isinstance(image, ImageClass):
         img_obj = HipsImage()
-        img_obj.pixels = image.PixelValues
+        img_obj.pixels = image._hwbPixelValues()
         img_obj.history = image.History
         img_obj.description = image.Description
         img_obj.mm_pixel = image.MmPixel
@@ -509,9 +845,24 @@ def _write_python(image, path, compression, verbose):
 
     if compression == "SameAsImageClass":
         compression = None
+        source = getattr(image, "_python_hips_image", None)
+        if source is not None and not source._quantization_parameters:
+            # Keep GZIP compression; the pixel format itself follows the pixel dtype
+            img_obj.format = HipsFormat(HipsFormat.PFBYTE | (source.format & 0x80))
+            # Pixels converted on read (e.g. uint8 files read as float32) are stored
+            # back in the file's own dtype as long as that is lossless
+            storedDtype = np.dtype(source._format_dtype())
+            if img_obj.pixels.dtype != storedDtype:
+                stored = img_obj.pixels.astype(storedDtype)
+                if np.array_equal(stored, img_obj.pixels):
+                    img_obj.pixels = stored
         
-    img_obj.write(path, compression)
+    img_obj.write(path, compression, profile=profile, auto_range=auto_range)
     
+    if hasattr(path, "write"):
+        if verbose:
+            print("HIPS image successfully written (python backend) to the file object")
+        return path
     if os.path.isfile(path):
         fullPath = os.path.abspath(path)
         if verbose:
@@ -519,6 +870,16 @@ def _write_python(image, path, compression, verbose):
         return fullPath
     return None
 
+def _write_clr_to_stream(image, stream, compression, verbose):
+    # HipsIO.SaveImage only writes to a path, so go through a temporary file
+    with tempfile.NamedTemporaryFile(delete_on_close=False, suffix='.hips') as tmp_file:
+        tmp_file.close()
+        if _write_clr(image, tmp_file.name, compression, verbose) is None:
+            return None
+        with open(tmp_file.name, 'rb') as f:
+            shutil.copyfileobj(f, stream)
+    return stream
+
 def _write_clr(image, path, compression, verbose):
     from videometer import vm_utils_clr
     import VM.Image as VMIm
@@ -530,7 +891,7 @@ def _write_clr(image, path, compression, verbose):
         if compression == "SameAsImageClass":
             compression = "Uncompressed"
     elif type(image) == ImageClass:
-        imagearr = image.PixelValues
+        imagearr = image._hwbPixelValues()
 
         # Check if all Image layers match the size of the image.
         h, w, _ = imagearr.shape
@@ -696,7 +1057,7 @@ def show(image, ifUseMask=False, bandIndexesToUse=[], ifOnlyGetListOfPLTObjects=
         raise TypeError("image needs to be a ImageClass object or 3-D numpy array")
 
     if type(image) == ImageClass:
-        imagearr = image.PixelValues.copy()
+        imagearr = image._hwbPixelValues().copy()
         if ifUseMask:
             if image.ForegroundPixels is None:
                 raise AttributeError("ForegroundPixels attribute not set")
@@ -737,8 +1098,6 @@ def show(image, ifUseMask=False, bandIndexesToUse=[], ifOnlyGetListOfPLTObjects=
 def showRGB(img, ifUseMask=False):
     """Function that shows sRGB representation of the image.
 
-    Note: This currently requires the 'clr' backend.
-
     Args:
         img (ImageClass): The image object to display.
         ifUseMask (bool, optional): If True, apply the foreground mask.
@@ -761,11 +1120,15 @@ def showRGB(img, ifUseMask=False):
     return ax_im
 
 
-def readOnlyPixelValues(path):
+def readOnlyPixelValues(path, layout="hwb", dtype=np.float32):
     """Function that reads the HIPS image and returns only its pixel values.
 
     Args:
         path (str): Full path to the .hips image.
+        layout (str, optional): "hwb" for a (height, width, bands) array or "bhw" for a
+            contiguous (bands, height, width) cube. Defaults to "hwb".
+        dtype (np.dtype, optional): dtype of the returned array, see `read`. Defaults
+            to np.float32.
 
     Returns:
         np.ndarray: A 3-D NumPy array of pixel values.
@@ -778,12 +1141,26 @@ def readOnlyPixelValues(path):
 
     if config.get_backend() == "python":
         from videometer.hips_core import HipsImage
-        img = HipsImage.read(path)
-        return img.pixels
+        img = HipsImage.read(path, layout=layout)
+        return _loadPixelsAs(img, dtype)
     else:
         import VM.Image.IO as VMImIO
         from videometer import vm_utils_clr
         VMImageObject = VMImIO.HipsIO.LoadImage(path)
-        npArray = vm_utils_clr.vmImage2npArray(VMImageObject)
+        npArray = vm_utils_clr.vmImage2npArray(VMImageObject, layout=layout, dtype=dtype)
         VMImageObject.Free()
         return npArray
+
+
+def _loadPixelsAs(hipsImage, dtype):
+    """Returns the pixels of a python-backend HipsImage, decoded straight into `dtype`."""
+    decodedDtype = np.dtype(hipsImage._pixel_dtype())
+    if (dtype is not None and hipsImage._pixels is None and np.dtype(dtype) != decodedDtype
+            and np.can_cast(decodedDtype, dtype, "same_kind")):
+        # Decoding into a preallocated buffer converts every band once, in place
+        hipsImage.load_pixels(out=hipsImage._allocate_pixels(dtype))
+    pixels = hipsImage.pixels
+    if dtype is not None:
+        # De-quantized (float) pixels requested as integers are cast like raw files are
+        pixels = pixels.astype(dtype, copy=False)
+    return pixels
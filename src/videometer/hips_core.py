@@ -1,8 +1,17 @@
+import collections
+import contextlib
+import copy
+import io
+import math
 import os
+import shutil
 import struct
+import tempfile
+import warnings
+import zlib
 import numpy as np
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union, BinaryIO
 from enum import IntEnum
 from dataclasses import dataclass, field
 
@@ -22,7 +31,9 @@ class HipsFormat(IntEnum):
     # Compressed formats
     PFBYTE_GZ = 0x80 + 0
     PFSHORT_GZ = 0x80 + 1
+    PFINT_GZ = 0x80 + 2
     PFFLOAT_GZ = 0x80 + 3
+    PFDOUBLE_GZ = 0x80 + 6
     PFRGB_GZ = 0x80 + 35
 
     PFBYTE_JPG = 0x100 + 0
@@ -45,26 +56,61 @@ class RawEncoder(BaseEncoder):
         return band_data.astype(self.dtype).tobytes()
 
 class GzipEncoder(BaseEncoder):
-    """Encodes band data using GZIP compression."""
-    def __init__(self, dtype: np.dtype):
+    """Encodes band data using GZIP compression.
+
+    Args:
+        dtype (np.dtype): dtype the band is stored with, or None to keep the dtype of
+            the band data (quantized codes are uint8 or int16 depending on the band).
+        compress_level (int, optional): zlib level, 1 (fastest) to 9 (smallest).
+            Defaults to 9.
+        strategy (int, optional): zlib strategy, e.g. ``zlib.Z_FILTERED`` or
+            ``zlib.Z_RLE``. Defaults to ``zlib.Z_DEFAULT_STRATEGY``.
+    """
+    def __init__(self, dtype: np.dtype, compress_level: int = 9, strategy: Optional[int] = None):
         self.dtype = dtype
+        self.compress_level = compress_level
+        self.strategy = strategy
         
     def encode_band(self, band_data: np.ndarray) -> bytes:
-        import gzip
-        raw_bytes = band_data.astype(self.dtype).tobytes()
-        return gzip.compress(raw_bytes)
+        if self.dtype is not None:
+            band_data = band_data.astype(self.dtype, copy=False)
+        raw_bytes = band_data.tobytes()
+        strategy = zlib.Z_DEFAULT_STRATEGY if self.strategy is None else self.strategy
+        # wbits=31 writes a gzip member, as gzip.compress does
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 31, 8, strategy)
+        return compressor.compress(raw_bytes) + compressor.flush()
 
 class PngEncoder(BaseEncoder):
-    """Encodes band data as a PNG image."""
+    """Encodes band data as a PNG image.
+
+    Args:
+        compress_level (int, optional): zlib level, 0 (none) to 9 (smallest). If None,
+            Pillow's default (6) is used.
+        strategy (int, optional): zlib strategy, e.g. ``zlib.Z_FILTERED`` or
+            ``zlib.Z_RLE``. If None, Pillow's default is used.
+    """
+    def __init__(self, compress_level: Optional[int] = None, strategy: Optional[int] = None):
+        self.compress_level = compress_level
+        self.strategy = strategy
+
     def encode_band(self, band_data: np.ndarray) -> bytes:
         import io
         from PIL import Image
         
         # PIL expects (H, W) for grayscale
         # band_data should be uint8 or uint16 for PNG
+        if band_data.dtype == np.int16:
+            # Quantized codes are never negative; as uint16 they are saved as 16-bit
+            # grayscale, which gives the same PNG as the deprecated 32-bit "I" mode
+            band_data = band_data.view(np.uint16)
         img = Image.fromarray(band_data)
+        options = {}
+        if self.compress_level is not None:
+            options["compress_level"] = self.compress_level
+        if self.strategy is not None:
+            options["compress_type"] = self.strategy
         buf = io.BytesIO()
-        img.save(buf, format="PNG")
+        img.save(buf, format="PNG", **options)
         return buf.getvalue()
 
 class JpegEncoder(BaseEncoder):
@@ -85,7 +131,8 @@ class JpegEncoder(BaseEncoder):
         img.save(buf, format="JPEG", quality=self.quality)
         return buf.getvalue()
 
-# Pre-defined Videometer compression presets
+# Pre-defined Videometer compression presets. The PNG/GZIP encoders use their default
+# zlib settings; see COMPRESSION_PROFILES to trade speed against size.
 COMPRESSION_PRESETS = {
     "Uncompressed": {
         "format": HipsFormat.PFFLOAT,
@@ -109,6 +156,36 @@ COMPRESSION_PRESETS = {
     }
 }
 
+# Uncompressed formats that store each dtype as it is, smallest first
+_NATIVE_FORMATS = [
+    (np.uint8, HipsFormat.PFBYTE),
+    (np.int16, HipsFormat.PFSHORT),
+    (np.int32, HipsFormat.PFINT),
+    (np.float32, HipsFormat.PFFLOAT),
+    (np.float64, HipsFormat.PFDOUBLE),
+]
+
+def _native_format(dtype) -> HipsFormat:
+    """Returns the smallest uncompressed HIPS format holding `dtype` values without loss.
+
+    HIPS has no 64-bit integer format, so int64 and uint64 pixels are stored as PFDOUBLE,
+    which is exact only up to 2**53.
+    """
+    if np.dtype(dtype).kind in "iu" and np.dtype(dtype).itemsize == 8:
+        return HipsFormat.PFDOUBLE
+    for native_dtype, pixel_format in _NATIVE_FORMATS:
+        if np.can_cast(dtype, native_dtype, casting="safe"):
+            return pixel_format
+    return HipsFormat.PFDOUBLE
+
+# Named speed/size trade-offs for the PNG/GZIP encoders, applied on top of a preset.
+# Z_RLE skips the match search; on PNG-filtered bands it is many times faster than
+# the default strategy at a similar size (see the table in the usage guide).
+COMPRESSION_PROFILES = {
+    "fast": {"compress_level": 1, "strategy": zlib.Z_RLE},
+    "small": {"compress_level": 9},
+}
+
 # Illumination types mapping
 ILLUMINATION_TYPES = {
     -1: "Mixed",
@@ -141,6 +218,303 @@ class QuantizationParameters:
 # old name importable so existing callers do not break.
 QuantificationParameters = QuantizationParameters
 
+
+def _scale_offset(qp: QuantizationParameters) -> Tuple[float, float]:
+    """Returns the (scale, offset) mapping a quantized code back to its pixel value."""
+    # C# divides: Factor = (2^Q - 1) / Range, value = code / Factor + Q_Min. Decoding uses
+    # the precomputed multiply-add code * scale + offset instead, which matches the C#
+    # division to within 1 ulp rather than exactly.
+    max_q_val = float(2**qp.Q - 1)
+    q_range = qp.Q_Max - qp.Q_Min
+    return q_range / max_q_val, qp.Q_Min
+
+
+def dequantize(codes: np.ndarray, scale, offset, band_axis: int = -1,
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Expands quantized codes to pixel values as ``codes * scale + offset``.
+
+    Works on a whole cube, a tile of it or a single band, so codes read with
+    ``dequantize=False`` can be expanded lazily.
+
+    Args:
+        codes (np.ndarray): Quantized integer codes.
+        scale (float or np.ndarray): Scale, or one scale per band.
+        offset (float or np.ndarray): Offset, or one offset per band.
+        band_axis (int, optional): Axis of `codes` the per-band parameters run along.
+            Defaults to -1, i.e. (height, width, bands) data.
+        out (np.ndarray, optional): Array to write the result into. Defaults to a new
+            float32 array.
+
+    Returns:
+        np.ndarray: The de-quantized pixel values.
+    """
+    scale = np.asarray(scale, dtype=np.float32)
+    offset = np.asarray(offset, dtype=np.float32)
+    if scale.ndim > 0:
+        shape = [1] * codes.ndim
+        shape[band_axis] = -1
+        scale = scale.reshape(shape)
+        offset = offset.reshape(shape)
+    if out is None:
+        out = np.empty(codes.shape, dtype=np.float32)
+    np.multiply(codes, scale, out=out)
+    np.add(out, offset, out=out)
+    return out
+
+
+# Number of values quantized per block; the float scratch buffer is reused between
+# blocks so it stays small and in cache.
+_QUANTIZE_BLOCK = 1 << 18
+
+
+def quantize(values: np.ndarray, q_params: List[QuantizationParameters], band_axis: int = -1,
+             out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Maps pixel values to quantized codes for a whole cube in one pass.
+
+    Computes ``round((value - Q_Min) / (Q_Max - Q_Min) * (2^Q - 1))`` clipped to the code
+    range, with the per-band parameters broadcast along `band_axis`. The work is done in
+    row blocks with in-place ufuncs on one reusable scratch buffer, and the codes are
+    written into `out`. The arithmetic matches `HipsImage._quantize_band` bit for bit.
+
+    Args:
+        values (np.ndarray): Pixel values.
+        q_params (List[QuantizationParameters]): One set of parameters per band.
+        band_axis (int, optional): Axis of `values` the bands run along. Defaults to -1,
+            i.e. (height, width, bands) data.
+        out (np.ndarray, optional): Integer array to write the codes into. Defaults to a
+            new uint8 array if every band has Q <= 8, else int16.
+
+    Returns:
+        np.ndarray: The quantized codes.
+    """
+    band_axis = band_axis % values.ndim
+    # Same intermediate precision as quantizing band by band with Python float scalars
+    work_dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64
+    q = np.array([qp.Q for qp in q_params])
+    max_q = (2.0 ** q - 1).astype(work_dtype)
+    q_min = np.array([qp.Q_Min for qp in q_params], dtype=np.float64)
+    q_range = np.array([qp.Q_Max for qp in q_params], dtype=np.float64) - q_min
+    zero_range = q_range == 0
+    q_range[zero_range] = 1.0
+
+    shape = [1] * values.ndim
+    shape[band_axis] = -1
+    q_min = q_min.astype(work_dtype).reshape(shape)
+    q_range = q_range.astype(work_dtype).reshape(shape)
+    max_q = max_q.reshape(shape)
+
+    if out is None:
+        out = np.empty(values.shape, dtype=np.uint8 if q.max() <= 8 else np.int16)
+
+    # Blocks are taken along the first axis that is not the band axis
+    block_axis = 1 if band_axis == 0 and values.ndim > 1 else 0
+    row_size = max(values.size // max(values.shape[block_axis], 1), 1)
+    step = max(_QUANTIZE_BLOCK // row_size, 1)
+    scratch = None
+    for start in range(0, values.shape[block_axis], step):
+        index = [slice(None)] * values.ndim
+        index[block_axis] = slice(start, start + step)
+        index = tuple(index)
+        block = values[index]
+        if scratch is None or scratch.shape != block.shape:
+            scratch = np.empty(block.shape, dtype=work_dtype)
+        np.subtract(block, q_min, out=scratch)
+        np.divide(scratch, q_range, out=scratch)
+        np.multiply(scratch, max_q, out=scratch)
+        np.round(scratch, out=scratch)
+        np.clip(scratch, 0, max_q, out=scratch)
+        np.copyto(out[index], scratch, casting="unsafe")
+
+    if zero_range.any():
+        zero_index = [slice(None)] * values.ndim
+        zero_index[band_axis] = np.flatnonzero(zero_range)
+        out[tuple(zero_index)] = 0
+    return out
+
+def fit_quantization_ranges(values: np.ndarray, q_params: List[QuantizationParameters],
+                            percentiles: Optional[Tuple[float, float]] = None,
+                            band_axis: int = -1) -> List[QuantizationParameters]:
+    """Fits the quantization range of every band to the band's own values.
+
+    With fixed preset ranges (0 to 120), a dim band only uses a few of its codes and the
+    unused range still costs bits. A fitted band stays on the quantization grid of its
+    preset, so its values are reconstructed as before, but the range is moved to the
+    band's own values and `Q` lowered to the fewest bits that cover it; e.g. a 12-bit
+    band whose values span 0-5 is stored as an 8-bit band. A band wider than the preset
+    range gets a range of its own at the preset's `Q` instead of being clipped. The
+    per-band bounds are computed in one vectorized reduction over the cube and rounded
+    as they are stored in the header, so the written codes de-quantize with exactly
+    these parameters.
+
+    Args:
+        values (np.ndarray): Pixel values.
+        q_params (List[QuantizationParameters]): One set of parameters per band, giving
+            the quantization grid and the largest bit depth `Q` of each band.
+        percentiles (Tuple[float, float], optional): Lower and upper percentile (0-100)
+            used as the band bounds, so a few outliers do not stretch the range; values
+            outside are clipped. Defaults to None (the band minimum and maximum).
+        band_axis (int, optional): Axis of `values` the bands run along. Defaults to -1,
+            i.e. (height, width, bands) data.
+
+    Returns:
+        List[QuantizationParameters]: The fitted parameters. Bands without any finite
+        value keep their parameters from `q_params`.
+    """
+    band_axis = band_axis % values.ndim
+    axes = tuple(axis for axis in range(values.ndim) if axis != band_axis)
+    with warnings.catch_warnings():
+        # All-NaN bands are reported below by keeping their preset range
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if percentiles is None:
+            low, high = np.nanmin(values, axis=axes), np.nanmax(values, axis=axes)
+        else:
+            low, high = np.nanpercentile(values, percentiles, axis=axes)
+
+    fitted = []
+    for qp, q_min, q_max in zip(q_params, low.tolist(), high.tolist()):
+        if not (np.isfinite(q_min) and np.isfinite(q_max)):
+            fitted.append(qp)
+            continue
+        q_bits = qp.Q
+        step = (qp.Q_Max - qp.Q_Min) / (2**qp.Q - 1)
+        if step > 0:
+            # Snap the lower bound onto the preset grid and count the codes needed above it
+            grid_min = qp.Q_Min + math.floor((q_min - qp.Q_Min) / step) * step
+            needed = max(math.ceil(math.log2((q_max - grid_min) / step + 1) - 1e-9), 1)
+            if needed <= qp.Q:
+                q_bits = needed
+                q_min, q_max = grid_min, grid_min + (2**needed - 1) * step
+        # The XML header stores the bounds with "%g"; quantize with what readers will see
+        fitted.append(QuantizationParameters(Q=q_bits, Q_Min=float(f"{q_min:g}"),
+                                             Q_Max=float(f"{q_max:g}")))
+    return fitted
+
+# Metadata fields `HipsImage.rewrite_header` can change, mapped to a test for the names
+# of the X-params they are stored in (None for fields stored in the ASCII header).
+_REWRITABLE_FIELDS = {
+    "history": None,
+    "description": None,
+    "roi_height": None,
+    "roi_width": None,
+    "roi_y": None,
+    "roi_x": None,
+    "mm_pixel": lambda name: name == "MmPixel",
+    "camera_temperature": lambda name: name == "CameraTemperature",
+    "id": lambda name: name == "Id",
+    "freehand_layers_xml": lambda name: name == "FreehandLayersXML",
+    "drawing_primitive_xml": lambda name: name == "DrawingPrimitiveXML",
+    "band_names": lambda name: name.startswith("BandName") and name[len("BandName"):].isdigit(),
+    "extra_data": lambda name: name.startswith("ExtraData_"),
+    "extra_data_int": lambda name: name.startswith("ExtraDataInt_"),
+    "extra_data_string": lambda name: name.startswith("ExtraDataString_"),
+    "wavelengths": lambda name: name == "BandWaveLength",
+    "strobe_times": lambda name: name == "BandStrobeTime",
+    "strobe_times_universal": lambda name: name == "BandStrobeTimesUniversal",
+    "illumination": lambda name: name == "BandIllumination",
+}
+
+# Size of the first read when parsing a header. Typical headers (including the XParam
+# table) fit in this, so a header is usually parsed from a single read() call.
+_HEADER_READ_SIZE = 64 * 1024
+
+
+class _TruncatedHeader(Exception):
+    """Raised when header parsing runs past the bytes read so far."""
+
+
+class _HeaderBuffer(io.BytesIO):
+    """In-memory copy of the start of a file that header parsing reads from.
+
+    If the buffer does not hold the whole file, any read that runs past its end raises
+    `_TruncatedHeader` so the caller can read more of the file and parse again.
+    """
+    def __init__(self, data: bytes, complete: bool):
+        super().__init__(data)
+        self._complete = complete
+
+    def read(self, size: int = -1) -> bytes:
+        data = super().read(size)
+        if not self._complete and (size is None or size < 0 or len(data) < size):
+            raise _TruncatedHeader()
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        line = super().readline(size)
+        if not self._complete and not line.endswith(b'\n'):
+            raise _TruncatedHeader()
+        return line
+
+
+class _BufferReader:
+    """Read-only binary file interface over a memoryview.
+
+    Lets the header parser and band decoders run over an in-memory HIPS image the same
+    way they run over a file, without copying the buffer first.
+    """
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def __enter__(self) -> '_BufferReader':
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = 0) -> int:
+        if whence == 1:
+            pos += self._pos
+        elif whence == 2:
+            pos += len(self._view)
+        self._pos = max(pos, 0)
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(self._pos + size, end)
+        data = self._view[self._pos:end].tobytes()
+        self._pos = max(self._pos, end)
+        return data
+
+    def readinto(self, b) -> int:
+        target = memoryview(b).cast('B')
+        n = max(min(len(target), len(self._view) - self._pos), 0)
+        target[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def readline(self, size: int = -1) -> bytes:
+        # Header lines are short, so the newline is searched for in small windows
+        end = len(self._view)
+        stop = self._pos
+        while stop < end:
+            window = self._view[stop:stop + 256].tobytes()
+            newline = window.find(b'\n')
+            if newline >= 0:
+                stop += newline + 1
+                break
+            stop += len(window)
+        return self.read(stop - self._pos)
+
+
+def _read_value(f) -> str:
+    """Returns the next non-empty header line."""
+    while True:
+        line = f.readline()
+        if not line:
+            raise EOFError("Unexpected end of file while reading HIPS header")
+        line = line.decode('ascii', errors='replace').strip()
+        if line:
+            return line
+
+
 @dataclass
 class HipsImage:
     """
@@ -185,19 +559,35 @@ class HipsImage:
     _data_offset: int = 0
     _pixels: Optional[np.ndarray] = None
     _path: Optional[str] = None
+    _source: Any = None
+    _mmap: bool = False
+    _band_selection: Optional[List[int]] = None
+    _band_offsets: Optional[List[Tuple[int, int]]] = None
+    _file_bands: int = 0
+    _workers: Optional[int] = None
+    _layout: str = "hwb"
+    _dequantize: bool = True
     _x_params_raw: Dict[str, Any] = field(default_factory=dict)
+    # X-params exactly as read, as (name, format, count, header value or payload bytes)
+    _x_params_table: List[Tuple[str, str, int, Union[str, bytes]]] = field(default_factory=list)
 
     @property
     def pixels(self) -> np.ndarray:
-        """Access the pixel data as a 3D numpy array (height, width, bands)."""
+        """Access the pixel data as a 3D numpy array.
+
+        The array is (height, width, bands), or a contiguous (bands, height, width)
+        cube if the image was read with ``layout="bhw"``.
+        """
         if self._pixels is None:
             self.load_pixels()
         return self._pixels
 
     @pixels.setter
     def pixels(self, value: np.ndarray):
-        """Sets the pixel data and updates dimensions."""
+        """Sets the pixel data from a (height, width, bands) array and updates dimensions."""
         self._pixels = value
+        self._layout = "hwb"
+        self._dequantize = True
         self.height, self.width = value.shape[:2]
         if len(value.shape) > 2:
             self.bands = value.shape[2]
@@ -217,13 +607,22 @@ class HipsImage:
     def reduce_bands(self, indexes: List[int]):
         """Reduces the image to only the specified band indexes.
 
+        If the pixels have not been loaded yet, the reduction is deferred to the
+        reader so that only the kept bands are decoded from the file.
+
         Args:
             indexes (List[int]): List of band indexes to keep.
         """
-        if self._pixels is None:
-            self.load_pixels()
-            
-        self._pixels = self._pixels[:, :, indexes]
+        if self._pixels is None and self._has_source():
+            selection = self._selected_bands()
+            self._band_selection = [selection[i] for i in indexes]
+        else:
+            if self._pixels is None:
+                self.load_pixels()
+            if self._layout == "bhw":
+                self._pixels = self._pixels[indexes]
+            else:
+                self._pixels = self._pixels[:, :, indexes]
         self.bands = len(indexes)
         
         if len(self.wavelengths) > 0:
@@ -239,21 +638,88 @@ class HipsImage:
         if self._quantization_parameters:
             self._quantization_parameters = [self._quantization_parameters[i] for i in indexes]
 
-    def load_pixels(self):
+    def _has_source(self) -> bool:
+        """Whether pixel data can still be read from a file, buffer or file object."""
+        return bool(self._path) or self._source is not None
+
+    def _open(self):
+        """Opens the pixel data source as a binary file-like context manager.
+
+        In-memory buffers are read through a `_BufferReader`, and caller-owned file
+        objects are used as they are and left open.
+        """
+        if isinstance(self._source, memoryview):
+            return _BufferReader(self._source)
+        if self._source is not None:
+            return contextlib.nullcontext(self._source)
+        return open(self._path, 'rb')
+
+    def _band_view(self, b: int) -> np.ndarray:
+        """Returns a (height, width) view of band `b` of the loaded pixels."""
+        if self._layout == "bhw":
+            return self._pixels[b]
+        return self._pixels[:, :, b]
+
+    def _allocate_pixels(self, dtype) -> np.ndarray:
+        """Allocates a zeroed pixel cube in the layout of this image."""
+        if self._layout == "bhw":
+            return np.zeros((self.bands, self.height, self.width), dtype=dtype)
+        return np.zeros((self.height, self.width, self.bands), dtype=dtype)
+
+    def _from_hwb(self, cube: np.ndarray) -> np.ndarray:
+        """Converts a decoded (height, width, bands) cube to the layout of this image."""
+        if self._layout == "bhw":
+            return np.ascontiguousarray(cube.transpose(2, 0, 1))
+        return cube
+
+    def _selected_bands(self) -> List[int]:
+        """Returns the file band index backing each band of this image."""
+        if self._band_selection is not None:
+            return self._band_selection
+        return list(range(self.bands))
+
+    def load_pixels(self, workers: Optional[int] = None, dequantize: Optional[bool] = None,
+                    out: Optional[np.ndarray] = None):
         """Loads the pixel data from the file.
 
         This method is called lazily when the `pixels` property is accessed.
         It reads the binary data from the HIPS file, handles decompression
-        (GZIP, PNG, JPEG), and performs de-quantization if necessary.
+        (GZIP, PNG, JPEG), and performs de-quantization if necessary. Only the
+        bands kept by a previous `reduce_bands` call are decoded.
+
+        Args:
+            workers (int, optional): Number of threads used to decode and de-quantize
+                compressed bands concurrently. zlib and Pillow release the GIL while
+                decoding, so this scales with cores. If None, the value given to
+                `read` is used; 1 or None decodes serially.
+            dequantize (bool, optional): If False, quantized images keep their stored
+                uint8/int16 codes instead of being expanded to float32. See
+                `quantization_scale_offset`. If None, the value given to `read` is used.
+            out (np.ndarray, optional): Preallocated array to decode into, e.g. a float32
+                or float16 buffer reused across images. It must have the shape of
+                `pixels`. De-quantization is done in place into this array, so no
+                per-image pixel buffers are allocated.
 
         Raises:
-            ValueError: If no file path is associated with this HipsImage.
+            ValueError: If no file path is associated with this HipsImage, or if `out`
+                has the wrong shape.
             EOFError: If the file ends unexpectedly.
         """
-        if not self._path:
+        if not self._has_source():
             raise ValueError("No file path associated with this HipsImage.")
+        if out is not None:
+            if self._layout == "bhw":
+                expected_shape = (self.bands, self.height, self.width)
+            else:
+                expected_shape = (self.height, self.width, self.bands)
+            if out.shape != expected_shape:
+                raise ValueError(f"out has shape {out.shape}, expected {expected_shape}")
+        if workers is None:
+            workers = self._workers
+        if dequantize is not None:
+            self._dequantize = dequantize
             
-        with open(self._path, 'rb') as f:
+        with self._open() as f:
             f.seek(self._data_offset)
             
             # Identify compression
@@ -264,7 +730,10 @@ class HipsImage:
             is_compressed = is_gz or is_jpg or is_png
             
             if not is_compressed and self._quantization_parameters is None:
-                self._load_raw_pixels(f)
+                if self._mmap and out is None and self._source is None:
+                    self._map_raw_pixels()
+                else:
+                    self._load_raw_pixels(f, out)
             else:
                 # Some files might have the format flag but NO size table 
                 # (e.g. if they were saved with a different version or specific settings)
@@ -283,84 +752,67 @@ class HipsImage:
                 
                 # For plate.hips, first_val was ~2.3M, which is smaller than raw band (~19M)
                 # so it IS likely a size table.
-                self._load_compressed_or_quantified_pixels(f, is_gz, is_jpg, is_png)
+                self._load_compressed_or_quantified_pixels(f, is_gz, is_jpg, is_png, workers, out)
 
-    def _load_compressed_or_quantified_pixels(self, f, is_gz, is_jpg, is_png):
-        """Handles chunked compressed data and de-quantization with tiered bit-depth."""
-        import gzip
-        import io
-        from PIL import Image
-        
-        # Identity Swap: If OriginalFormat or quantization present, target is always float32
-        if self._quantization_parameters or self._original_format is not None:
-            target_dtype = np.float32
-        else:
-            dtype_map = {
-                HipsFormat.PFBYTE: np.uint8,
-                HipsFormat.PFSHORT: np.int16,
-                HipsFormat.PFINT: np.int32,
-                HipsFormat.PFFLOAT: np.float32,
-                HipsFormat.PFDOUBLE: np.float64,
-                HipsFormat.PFRGB: np.uint8,
-            }
-            actual_format = self.format & 0x7F
-            target_dtype = dtype_map.get(actual_format, np.uint8)
+    def _load_compressed_or_quantified_pixels(self, f, is_gz, is_jpg, is_png, workers=None, out=None):
+        """Handles chunked compressed data and de-quantization with tiered bit-depth.
 
-        self._pixels = np.zeros((self.height, self.width, self.bands), dtype=target_dtype)
+        With more than one worker, the chunks are read sequentially and then decoded
+        concurrently, each worker writing its band straight into the output cube.
+        """
+        target_dtype = self._target_dtype()
+        self._pixels = out if out is not None else self._allocate_pixels(target_dtype)
         is_rgb = (self.format & 0x7F) == HipsFormat.PFRGB
-        
-        for b in range(self.bands):
-            size_data = f.read(4)
-            if not size_data:
-                break
-            chunk_size = struct.unpack('<I', size_data)[0]
-            compressed_data = f.read(chunk_size)
-            
-            # Tiered Bit-Depth Container Selection
-            if self._quantization_parameters:
-                q_params = self._quantization_parameters[b]
-                stored_dtype = np.uint8 if q_params.Q <= 8 else np.int16
-            else:
-                # Default intermediate for non-quantified but compressed
-                stored_dtype = np.uint8 if not is_png and not is_jpg else None # PIL handles own dtype
-            
-            if is_gz:
-                decompressed_data = gzip.decompress(compressed_data)
-                if is_rgb:
-                    temp_pixels = np.frombuffer(decompressed_data, dtype=np.uint8).reshape(self.height, self.width, 3)
-                    self._pixels[:, :, :3] = temp_pixels
-                    break # PFRGB is 1 chunk
+        band_index = self._get_band_index(f)
+        selection = self._selected_bands()
+
+        if is_rgb and band_index:
+            # PFRGB is 1 chunk holding all three colour planes
+            offset, size = band_index[0]
+            f.seek(offset)
+            rgb = self._decode_chunk(f.read(size), 0)
+            if rgb.ndim == 3:
+                if out is not None:
+                    out[...] = self._from_hwb(rgb[:, :, selection])
                 else:
-                    decompressed_band = np.frombuffer(decompressed_data, dtype=stored_dtype).reshape(self.height, self.width)
-            elif is_png or is_jpg:
-                with Image.open(io.BytesIO(compressed_data)) as img:
-                    decompressed_band = np.array(img)
-                    if is_rgb and len(decompressed_band.shape) == 3:
-                        self._pixels[:, :, :3] = decompressed_band
-                        break # 1 chunk
-            else:
-                # RAW but quantified
-                decompressed_band = np.frombuffer(compressed_data, dtype=stored_dtype).reshape(self.height, self.width)
-                
-            if self._quantization_parameters:
-                # Reconstruction Engine (Inverse Linear Mapping)
-                q_params = self._quantization_parameters[b]
-                max_q_val = float(2**q_params.Q - 1)
-                q_range = q_params.Q_Max - q_params.Q_Min
-                
-                if q_range == 0:
-                    self._pixels[:, :, b] = q_params.Q_Min
-                else:
-                    # Match C# logic: Factor = (2^Q - 1) / Range
-                    factor = max_q_val / q_range
-                    self._pixels[:, :, b] = decompressed_band.astype(np.float32) / factor + q_params.Q_Min
+                    self._pixels = self._from_hwb(rgb[:, :, selection].astype(target_dtype))
+                return
+
+        parallel = workers is not None and workers > 1
+
+        def decode(job):
+            b, data = job
+            self._decode_chunk(data, b, out=self._band_view(b))
+
+        decoded = {}
+        duplicates = []
+        jobs = []
+        for b, file_band in enumerate(selection):
+            if file_band in decoded:
+                # A file band selected more than once is decoded only once
+                duplicates.append((b, decoded[file_band]))
+                continue
+            if file_band >= len(band_index):
+                break
+            offset, size = band_index[file_band]
+            f.seek(offset)
+            if parallel:
+                jobs.append((b, f.read(size)))
             else:
-                if len(decompressed_band.shape) == 3 and decompressed_band.shape[2] == 1:
-                    decompressed_band = decompressed_band.reshape(self.height, self.width)
-                self._pixels[:, :, b] = decompressed_band.astype(target_dtype)
+                decode((b, f.read(size)))
+            decoded[file_band] = b
+
+        if jobs:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                # list() propagates exceptions raised in the workers
+                list(executor.map(decode, jobs))
 
-    def _load_raw_pixels(self, f):
-        """Reads uncompressed band-sequential pixel data."""
+        for b, source in duplicates:
+            self._band_view(b)[...] = self._band_view(source)
+
+    def _format_dtype(self):
+        """Returns the dtype of the pixel format stored in the file."""
         dtype_map = {
             HipsFormat.PFBYTE: np.uint8,
             HipsFormat.PFSHORT: np.int16,
@@ -369,9 +821,357 @@ class HipsImage:
             HipsFormat.PFDOUBLE: np.float64,
             HipsFormat.PFRGB: np.uint8,
         }
-        
+        return dtype_map.get(self.format & 0x7F, np.uint8)
+
+    def _target_dtype(self):
+        """Returns the dtype the decoded compressed pixels are delivered in."""
+        if self._quantization_parameters and not self._dequantize:
+            return self._code_dtype()
+        # Identity Swap: If OriginalFormat or quantization present, target is always float32
+        if self._quantization_parameters or self._original_format is not None:
+            return np.float32
+        return self._format_dtype()
+
+    def _pixel_dtype(self):
+        """Returns the dtype `load_pixels` and `read_band` deliver the pixels in."""
+        if self.format & 0x380 or self._quantization_parameters is not None:
+            return self._target_dtype()
+        return self._format_dtype()
+
+    def _code_dtype(self):
+        """Returns the integer dtype holding the quantized codes of all bands."""
+        q_max_bits = max(qp.Q for qp in self._quantization_parameters)
+        return np.uint8 if q_max_bits <= 8 else np.int16
+
+    def quantization_scale_offset(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns the per-band de-quantization parameters.
+
+        A quantized code ``c`` of band ``b`` represents the pixel value
+        ``c * scale[b] + offset[b]``. Use together with ``dequantize=False`` reads and
+        the `dequantize` helper to expand the codes lazily or tile by tile.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: float32 (scale, offset) arrays with one entry
+            per band, or None if the image is not quantized.
+        """
+        if not self._quantization_parameters:
+            return None
+        params = [_scale_offset(qp) for qp in self._quantization_parameters]
+        scale = np.array([p[0] for p in params], dtype=np.float32)
+        offset = np.array([p[1] for p in params], dtype=np.float32)
+        return scale, offset
+
+    def _get_band_index(self, f) -> List[Tuple[int, int]]:
+        """Returns the (offset, size) of every size-prefixed band chunk in the file.
+
+        The table is built once by hopping from size prefix to size prefix, without
+        reading the chunk payloads, and is kept on the object for later calls.
+        """
+        if self._band_offsets is None:
+            if (self.format & 0x7F) == HipsFormat.PFRGB:
+                n_chunks = 1
+            else:
+                n_chunks = self._file_bands or self.bands
+            offsets = []
+            pos = self._data_offset
+            for _ in range(n_chunks):
+                f.seek(pos)
+                size_data = f.read(4)
+                if len(size_data) < 4:
+                    break
+                chunk_size = struct.unpack('<I', size_data)[0]
+                offsets.append((pos + 4, chunk_size))
+                pos += 4 + chunk_size
+            self._band_offsets = offsets
+        return self._band_offsets
+
+    def _decode_chunk(self, compressed_data: bytes, b: int,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Decodes one size-prefixed chunk into band `b` (de-quantized if necessary).
+
+        Returns a (height, width) array, or (height, width, 3) for a PFRGB chunk. If
+        `out` is given, the band is written (and de-quantized) straight into it.
+        """
+        decompressed_band = self._chunk_codes(compressed_data, b)
+        if (self.format & 0x7F) == HipsFormat.PFRGB and decompressed_band.ndim == 3:
+            return decompressed_band
+        return self._finish_band(decompressed_band, b, out)
+
+    def _stored_dtype(self, b: int):
+        """Returns the dtype band `b` is stored with inside its chunk (None lets PIL decide)."""
+        # Tiered Bit-Depth Container Selection
+        if self._quantization_parameters:
+            q_params = self._quantization_parameters[b]
+            return np.uint8 if q_params.Q <= 8 else np.int16
+        # GZIP chunks hold the pixels in the dtype of the format
+        return self._format_dtype() if not self.format & 0x300 else None # PIL handles own dtype
+
+    def _chunk_codes(self, compressed_data: bytes, b: int) -> np.ndarray:
+        """Decompresses one chunk into its stored values, without de-quantization."""
+        import gzip
+        import io
+        from PIL import Image
+
+        is_gz = bool(self.format & 0x80)
+        is_jpg = bool(self.format & 0x100)
+        is_png = bool(self.format & 0x200)
+        is_rgb = (self.format & 0x7F) == HipsFormat.PFRGB
+        stored_dtype = self._stored_dtype(b)
+
+        if is_gz:
+            decompressed_data = gzip.decompress(compressed_data)
+            if is_rgb:
+                return np.frombuffer(decompressed_data, dtype=np.uint8).reshape(self.height, self.width, 3)
+            return np.frombuffer(decompressed_data, dtype=stored_dtype).reshape(self.height, self.width)
+        elif is_png or is_jpg:
+            with Image.open(io.BytesIO(compressed_data)) as img:
+                return np.array(img)
+        # RAW but quantified
+        return np.frombuffer(compressed_data, dtype=stored_dtype).reshape(self.height, self.width)
+
+    def _finish_band(self, decompressed_band: np.ndarray, b: int,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Turns the stored values of band `b` (or a crop of them) into pixel values."""
+        if self._quantization_parameters:
+            if not self._dequantize:
+                if out is None:
+                    return decompressed_band.astype(self._code_dtype(), copy=False)
+                np.copyto(out, decompressed_band, casting="unsafe")
+                return out
+            # Reconstruction Engine (Inverse Linear Mapping), fused into the destination
+            scale, offset = _scale_offset(self._quantization_parameters[b])
+            return dequantize(decompressed_band, scale, offset, out=out)
+
+        if len(decompressed_band.shape) == 3 and decompressed_band.shape[2] == 1:
+            decompressed_band = decompressed_band[:, :, 0]
+        if out is None:
+            return decompressed_band.astype(self._target_dtype())
+        np.copyto(out, decompressed_band)
+        return out
+
+    def read_band(self, b: int) -> np.ndarray:
+        """Reads and decodes a single band without loading the rest of the image.
+
+        For compressed files the chunk offset table is built on first use, after which
+        any band can be reached with a single seek.
+
+        Args:
+            b (int): Band index.
+
+        Returns:
+            np.ndarray: A 2-D (height, width) array with the band's pixel values.
+
+        Raises:
+            ValueError: If no file path is associated with this HipsImage.
+            EOFError: If the file ends before the band.
+        """
+        if self._pixels is not None:
+            return self._band_view(b)
+        if not self._has_source():
+            raise ValueError("No file path associated with this HipsImage.")
+
+        file_band = self._selected_bands()[b]
+        is_chunked = bool(self.format & 0x380) or self._quantization_parameters is not None
+        is_rgb = (self.format & 0x7F) == HipsFormat.PFRGB
+
+        with self._open() as f:
+            if is_chunked:
+                band_index = self._get_band_index(f)
+                chunk = 0 if is_rgb else file_band
+                if chunk >= len(band_index):
+                    raise EOFError(f"Unexpected end of file while reading band {file_band}")
+                offset, size = band_index[chunk]
+                f.seek(offset)
+                band = self._decode_chunk(f.read(size), b)
+                if band.ndim == 3:
+                    band = band[:, :, file_band].astype(self._target_dtype())
+                return band
+
+            dtype = self._format_dtype()
+            f.seek(self._data_offset)
+            if is_rgb:
+                data = np.empty((self.height, self.width, 3), dtype=dtype)
+                if f.readinto(data) < data.nbytes:
+                    raise EOFError("Unexpected end of file while reading RGB data")
+                return data[:, :, file_band].copy()
+
+            data = np.empty((self.height, self.width), dtype=dtype)
+            f.seek(self._data_offset + file_band * data.nbytes)
+            if f.readinto(data) < data.nbytes:
+                raise EOFError(f"Unexpected end of file while reading band {file_band}")
+            return data
+
+    def read_window(self, y: int, x: int, h: int, w: int,
+                    bands: Optional[List[int]] = None) -> np.ndarray:
+        """Reads a rectangular crop of the image without decoding the whole cube.
+
+        Uncompressed files are read row slab by row slab, and GZIP chunks are
+        decompressed only up to the last row of the window, so small crops cost time
+        roughly in proportion to their size. PNG and JPEG chunks have to be decoded
+        whole, but only the crop is de-quantized. The ROI stored in the header can be
+        read with ``img.read_window(img.roi_y, img.roi_x, img.roi_height, img.roi_width)``.
+
+        Args:
+            y (int): First row of the window.
+            x (int): First column of the window.
+            h (int): Height of the window.
+            w (int): Width of the window.
+            bands (List[int], optional): Bands to read. If None, all bands are read.
+
+        Returns:
+            np.ndarray: A (h, w, bands) array, or (bands, h, w) with ``layout="bhw"``.
+
+        Raises:
+            ValueError: If the window is outside the image or no file path is associated
+                with this HipsImage.
+            EOFError: If the file ends before the window.
+        """
+        if y < 0 or x < 0 or h <= 0 or w <= 0 or y + h > self.height or x + w > self.width:
+            raise ValueError(f"Window ({y}, {x}, {h}, {w}) is outside the {self.height}x{self.width} image")
+        band_list = list(range(self.bands)) if bands is None else list(bands)
+        if self._pixels is not None:
+            if self._layout == "bhw":
+                return self._pixels[band_list, y:y + h, x:x + w]
+            return self._pixels[y:y + h, x:x + w, band_list]
+        if not self._has_source():
+            raise ValueError("No file path associated with this HipsImage.")
+
+        selection = self._selected_bands()
+        is_chunked = bool(self.format & 0x380) or self._quantization_parameters is not None
+        is_rgb = (self.format & 0x7F) == HipsFormat.PFRGB
+        dtype = self._pixel_dtype()
+        if self._layout == "bhw":
+            window = np.empty((len(band_list), h, w), dtype=dtype)
+            band_view = lambda i: window[i]
+        else:
+            window = np.empty((h, w, len(band_list)), dtype=dtype)
+            band_view = lambda i: window[:, :, i]
+
+        with self._open() as f:
+            if not is_chunked:
+                channels = 3 if is_rgb else 1
+                row_size = self.width * channels * np.dtype(dtype).itemsize
+                for i, b in enumerate(band_list):
+                    file_band = selection[b]
+                    band_start = self._data_offset
+                    if not is_rgb:
+                        band_start += file_band * self.height * row_size
+                    # Only the rows spanned by the window are read
+                    f.seek(band_start + y * row_size)
+                    data = f.read(h * row_size)
+                    if len(data) < h * row_size:
+                        raise EOFError(f"Unexpected end of file while reading band {file_band}")
+                    rows = np.frombuffer(data, dtype=dtype).reshape(h, self.width, channels)
+                    band_view(i)[...] = rows[:, x:x + w, file_band if is_rgb else 0]
+                return window
+
+            band_index = self._get_band_index(f)
+            for i, b in enumerate(band_list):
+                file_band = selection[b]
+                chunk = 0 if is_rgb else file_band
+                if chunk >= len(band_index):
+                    raise EOFError(f"Unexpected end of file while reading band {file_band}")
+                offset, size = band_index[chunk]
+                if self.format & 0x80:
+                    codes = self._inflate_rows(f, offset, size, b, y + h)[y:]
+                else:
+                    f.seek(offset)
+                    codes = self._chunk_codes(f.read(size), b)[y:y + h]
+                codes = codes[:, x:x + w]
+                if is_rgb and codes.ndim == 3:
+                    band_view(i)[...] = codes[:, :, file_band]
+                else:
+                    self._finish_band(codes, b, out=band_view(i))
+        return window
+
+    def foreground_pixels_table(self, mask: np.ndarray,
+                                bands: Optional[List[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Extracts the pixels inside a foreground mask as a (pixels, bands) table.
+
+        If the pixels are loaded they are gathered from the cube with one boolean index.
+        Otherwise the bands are decoded one at a time and only their foreground pixels
+        are kept, so the full cube is never held in memory.
+
+        Args:
+            mask (np.ndarray): (height, width) foreground mask; nonzero pixels are kept.
+            bands (List[int], optional): Bands to extract. If None, all bands are used.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: A C-contiguous (N, bands) array with one row
+            per foreground pixel in row-major order, and an (N, 2) array with the
+            (row, column) of each row.
+
+        Raises:
+            ValueError: If the mask does not match the image size or no file path is
+                associated with this HipsImage.
+        """
+        mask = np.asarray(mask)
+        if mask.shape != (self.height, self.width):
+            raise ValueError(f"Mask shape {mask.shape} does not match the {self.height}x{self.width} image")
+        mask = mask.astype(bool, copy=False)
+        band_list = list(range(self.bands)) if bands is None else list(bands)
+        coordinates = np.argwhere(mask)
+
+        if self._pixels is not None:
+            if self._layout == "bhw":
+                table = self._pixels[:, mask]
+                if bands is not None:
+                    table = table[band_list]
+                table = np.ascontiguousarray(table.T)
+            elif bands is None:
+                table = self._pixels[mask]
+            else:
+                table = self._pixels[mask][:, band_list]
+            return table, coordinates
+        if not self._has_source():
+            raise ValueError("No file path associated with this HipsImage.")
+
+        table = None
+        for i, b in enumerate(band_list):
+            values = self.read_band(b)[mask]
+            if table is None:
+                table = np.empty((len(values), len(band_list)), dtype=values.dtype)
+            table[:, i] = values
+        if table is None:
+            table = np.empty((len(coordinates), 0), dtype=self._pixel_dtype())
+        return table, coordinates
+
+    def _inflate_rows(self, f, offset: int, size: int, b: int, n_rows: int) -> np.ndarray:
+        """Stream-decompresses the first `n_rows` rows of the GZIP chunk at `offset`.
+
+        The chunk is read and inflated in blocks, and decompression stops as soon as
+        enough rows have been produced, so the rest of the chunk is never touched.
+        """
+        is_rgb = (self.format & 0x7F) == HipsFormat.PFRGB
+        stored_dtype = np.uint8 if is_rgb else self._stored_dtype(b)
+        channels = 3 if is_rgb else 1
+        needed = n_rows * self.width * channels * np.dtype(stored_dtype).itemsize
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        f.seek(offset)
+        remaining = size
+        parts = []
+        produced = 0
+        while produced < needed and remaining > 0:
+            block = f.read(min(remaining, 1 << 16))
+            if not block:
+                break
+            remaining -= len(block)
+            part = decompressor.decompress(block, needed - produced)
+            parts.append(part)
+            produced += len(part)
+        if produced < needed:
+            raise EOFError(f"Unexpected end of compressed data while reading band {b}")
+
+        rows = np.frombuffer(b"".join(parts), dtype=stored_dtype)
+        if is_rgb:
+            return rows.reshape(n_rows, self.width, 3)
+        return rows.reshape(n_rows, self.width)
+
+    def _load_raw_pixels(self, f, out=None):
+        """Reads uncompressed band-sequential pixel data, optionally into `out`."""
         actual_format = self.format & 0x7F
-        dtype = dtype_map.get(actual_format, np.uint8)
+        dtype = self._format_dtype()
         element_size = np.dtype(dtype).itemsize
         
         if actual_format == HipsFormat.PFRGB:
@@ -381,30 +1181,155 @@ class HipsImage:
             if len(data) < total_size:
                 raise EOFError("Unexpected end of file while reading RGB data")
             self._pixels = np.frombuffer(data, dtype=dtype).reshape(self.height, self.width, 3)
+            if self._band_selection is not None:
+                self._pixels = self._pixels[:, :, self._band_selection]
+            self._pixels = self._from_hwb(self._pixels)
+            if out is not None:
+                out[...] = self._pixels
+                self._pixels = out
         else:
             band_size = self.width * self.height * element_size
-            self._pixels = np.zeros((self.height, self.width, self.bands), dtype=dtype)
+            self._pixels = out if out is not None else self._allocate_pixels(dtype)
             
-            for b in range(self.bands):
+            for b, file_band in enumerate(self._selected_bands()):
+                # Bands are stored back to back, so only the selected slabs are read
+                f.seek(self._data_offset + file_band * band_size)
+                band = self._band_view(b)
+                if band.flags.c_contiguous and band.dtype == dtype:
+                    # Read straight into the destination without an intermediate buffer
+                    if f.readinto(band) < band_size:
+                        raise EOFError(f"Unexpected end of file while reading band {file_band}")
+                    continue
                 data = f.read(band_size)
                 if len(data) < band_size:
-                    raise EOFError(f"Unexpected end of file while reading band {b}")
-                self._pixels[:, :, b] = np.frombuffer(data, dtype=dtype).reshape(self.height, self.width)
+                    raise EOFError(f"Unexpected end of file while reading band {file_band}")
+                band[...] = np.frombuffer(data, dtype=dtype).reshape(self.height, self.width)
+
+    def _map_raw_pixels(self):
+        """Maps uncompressed band-sequential pixel data read-only without copying it.
+
+        The file is stored band after band, so it is mapped as (bands, height, width) and
+        exposed either directly (``layout="bhw"``) or as a transposed (height, width, bands)
+        view. Pages are only read from disk when the corresponding band is accessed.
+        """
+        actual_format = self.format & 0x7F
+        dtype = self._format_dtype()
+
+        selection = self._selected_bands()
+        if actual_format == HipsFormat.PFRGB:
+            shape = (self.height, self.width, 3)
+        else:
+            # Only map as far as the last band that is actually used
+            shape = (max(selection) + 1, self.height, self.width)
+
+        total_size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if os.path.getsize(self._path) - self._data_offset < total_size:
+            raise EOFError("Unexpected end of file while mapping pixel data")
+
+        data = np.memmap(self._path, dtype=dtype, mode='r', offset=self._data_offset, shape=shape)
+        if actual_format == HipsFormat.PFRGB:
+            self._pixels = data
+            if self._band_selection is not None:
+                self._pixels = data[:, :, selection]
+            if self._layout == "bhw":
+                self._pixels = self._pixels.transpose(2, 0, 1)
+            return
+
+        if self._band_selection is not None and selection != list(range(shape[0])):
+            # An arbitrary band subset cannot be expressed as a view; copy just those bands
+            data = data[selection]
+        self._pixels = data if self._layout == "bhw" else data.transpose(1, 2, 0)
 
     @classmethod
-    def read(cls, path: str) -> 'HipsImage':
+    def read(cls, path: Union[str, BinaryIO], mmap: bool = False,
+             band_indexes: Optional[List[int]] = None,
+             workers: Optional[int] = None,
+             layout: str = "hwb",
+             dequantize: bool = True) -> 'HipsImage':
         """Reads a HIPS file (header and prepares for lazy pixel loading).
 
         Args:
-            path (str): Path to the .hips file.
+            path (str or file object): Path to the .hips file, or a seekable binary file
+                object positioned at the start of a HIPS image. A file object is used
+                for the later pixel reads, so it must stay open until they are done.
+            mmap (bool, optional): If True, uncompressed pixel data is memory-mapped
+                instead of copied into memory. `pixels` is then a read-only (height, width,
+                bands) view over the file and bands are only read from disk when used.
+                Compressed or quantized files, and file objects, are decoded as usual.
+                Defaults to False.
+            band_indexes (List[int], optional): Bands to keep. Only these bands are
+                read and decoded when the pixels are loaded. If None, all bands are kept.
+            workers (int, optional): Number of threads used to decode compressed bands
+                when the pixels are loaded. Defaults to None (serial decoding).
+            layout (str, optional): Memory layout of `pixels`. "hwb" gives the usual
+                (height, width, bands) array; "bhw" gives a contiguous (bands, height,
+                width) cube, so every band is one contiguous block. Defaults to "hwb".
+            dequantize (bool, optional): If False, quantized images keep their stored
+                uint8/int16 codes in `pixels`, using a quarter of the memory of float32.
+                `quantization_scale_offset` gives the per-band parameters to expand them.
+                Defaults to True.
 
         Returns:
             HipsImage: An initialized HipsImage object.
+
+        Raises:
+            ValueError: If `layout` is not "hwb" or "bhw", or if the file object is not
+                seekable.
         """
-        img = cls.read_header(path)
-        img._path = path
+        if layout not in ("hwb", "bhw"):
+            raise ValueError(f"Invalid layout '{layout}'. Must be 'hwb' or 'bhw'.")
+        if hasattr(path, 'read'):
+            if not path.seekable():
+                raise ValueError("HIPS file objects must be seekable.")
+            img = cls._parse_header(path, getattr(path, 'name', "<file object>"))
+            img._source = path
+        else:
+            img = cls.read_header(path)
+            img._path = path
+        img._set_read_options(mmap, band_indexes, workers, layout, dequantize)
         return img
 
+    @classmethod
+    def from_buffer(cls, buffer, band_indexes: Optional[List[int]] = None,
+                    workers: Optional[int] = None,
+                    layout: str = "hwb",
+                    dequantize: bool = True) -> 'HipsImage':
+        """Reads a HIPS image held in memory, e.g. a blob fetched from a database.
+
+        The header and the bands are parsed directly from the buffer, without writing it
+        to a temporary file. The buffer is not copied, so it must not be modified until
+        the pixels have been loaded.
+
+        Args:
+            buffer (bytes, bytearray or memoryview): The complete HIPS file contents.
+            band_indexes (List[int], optional): Bands to keep. See `read`.
+            workers (int, optional): Number of decoding threads. See `read`.
+            layout (str, optional): "hwb" or "bhw". See `read`. Defaults to "hwb".
+            dequantize (bool, optional): See `read`. Defaults to True.
+
+        Returns:
+            HipsImage: An initialized HipsImage object.
+
+        Raises:
+            ValueError: If `layout` is not "hwb" or "bhw", or if the buffer is not a
+                valid HIPS image.
+        """
+        if layout not in ("hwb", "bhw"):
+            raise ValueError(f"Invalid layout '{layout}'. Must be 'hwb' or 'bhw'.")
+        view = memoryview(buffer).cast('B')
+        img = cls._parse_header(_BufferReader(view), "<buffer>")
+        img._source = view
+        img._set_read_options(False, band_indexes, workers, layout, dequantize)
+        return img
+
+    def _set_read_options(self, mmap, band_indexes, workers, layout, dequantize):
+        self._mmap = mmap
+        self._layout = layout
+        self._workers = workers
+        self._dequantize = dequantize
+        if band_indexes is not None:
+            self.reduce_bands(list(band_indexes))
+
     @classmethod
     def read_header(cls, path: str) -> 'HipsImage':
         """Reads the HIPS header from a file without loading pixel data.
@@ -418,63 +1343,76 @@ class HipsImage:
         Raises:
             ValueError: If the file is not a valid HIPS image.
         """
-        with open(path, 'rb') as f:
-            def read_next_val():
-                while True:
-                    line = f.readline().decode('ascii', errors='replace').strip()
-                    if line:
-                        return line
-
-            line = f.readline().decode('ascii').strip()
-            if "HIPS" not in line:
+        # The header is parsed from memory: one bounded read covers it in the common
+        # case, and the read is only grown when the header is larger than that.
+        size = _HEADER_READ_SIZE
+        with open(path, 'rb', buffering=0) as f:
+            data = f.read(size)
+            if b"HIPS" not in data.split(b'\n', 1)[0]:
                 raise ValueError(f"File {path} is not a valid HIPS image.")
-            
-            f.readline() # onm
-            f.readline() # snm
-            frames = int(read_next_val())
-            f.readline() # odt
-            
-            height = int(read_next_val())
-            width = int(read_next_val())
-            
-            roi_height = int(read_next_val())
-            roi_width = int(read_next_val())
-            roi_y = int(read_next_val())
-            roi_x = int(read_next_val())
-            
-            pixel_format = HipsFormat(int(read_next_val()))
-            colors = int(read_next_val())
-            bands = frames if (frames > colors or pixel_format == HipsFormat.PFRGB) else colors
-            
-            img = cls(
-                width=width, height=height, bands=bands, format=pixel_format,
-                roi_height=roi_height, roi_width=roi_width, roi_y=roi_y, roi_x=roi_x
-            )
-            img._path = path
-            
-            szhist = int(read_next_val())
-            history_bytes = f.read(szhist)
-            img.history = history_bytes.decode('utf-8', errors='replace').rstrip('\n\r\0')
-            
-            szdesc = int(read_next_val())
-            description_bytes = f.read(szdesc)
-            img.description = description_bytes.decode('utf-8', errors='replace').rstrip('\n\r\0')
-            
-            # Extended Parameters
-            img._read_x_params(f)
-            img._data_offset = f.tell()
-            return img
+            while True:
+                complete = len(data) < size
+                try:
+                    img = cls._parse_header(_HeaderBuffer(data, complete), path)
+                except _TruncatedHeader:
+                    data += f.read(size * 3)
+                    size *= 4
+                    continue
+                img._path = path
+                return img
+
+    @classmethod
+    def _parse_header(cls, f, path: str) -> 'HipsImage':
+        """Parses the ASCII header and XParam table from a binary file-like object.
+
+        Leaves `_data_offset` at the start of the pixel data, relative to the start of `f`.
+        """
+        line = f.readline().decode('ascii', errors='replace').strip()
+        if "HIPS" not in line:
+            raise ValueError(f"File {path} is not a valid HIPS image.")
+        
+        f.readline() # onm
+        f.readline() # snm
+        frames = int(_read_value(f))
+        f.readline() # odt
+        
+        height = int(_read_value(f))
+        width = int(_read_value(f))
+        
+        roi_height = int(_read_value(f))
+        roi_width = int(_read_value(f))
+        roi_y = int(_read_value(f))
+        roi_x = int(_read_value(f))
+        
+        pixel_format = HipsFormat(int(_read_value(f)))
+        colors = int(_read_value(f))
+        bands = frames if (frames > colors or pixel_format == HipsFormat.PFRGB) else colors
+        
+        img = cls(
+            width=width, height=height, bands=bands, format=pixel_format,
+            roi_height=roi_height, roi_width=roi_width, roi_y=roi_y, roi_x=roi_x
+        )
+        img._file_bands = bands
+        
+        szhist = int(_read_value(f))
+        history_bytes = f.read(szhist)
+        img.history = history_bytes.decode('utf-8', errors='replace').rstrip('\n\r\0')
+        
+        szdesc = int(_read_value(f))
+        description_bytes = f.read(szdesc)
+        img.description = description_bytes.decode('utf-8', errors='replace').rstrip('\n\r\0')
+        
+        # Extended Parameters
+        img._read_x_params(f)
+        img._data_offset = f.tell()
+        return img
 
     def _read_x_params(self, f):
-        def read_next_val():
-            while True:
-                line = f.readline().decode('ascii', errors='replace').strip()
-                if line:
-                    return line
+        read_next_val = lambda: _read_value(f)
         
         try:
             line = read_next_val()
-        except:
+        except EOFError:
             return
             
         n_param = int(line)
@@ -498,7 +1436,8 @@ class HipsImage:
             
         line = read_next_val()
         byte_offset_total = int(line)
-        binary_start = f.tell()
+        # The whole binary block is read at once and the arrays are sliced out of it
+        binary_block = f.read(byte_offset_total)
         
         for xp in x_params:
             name = xp['name']
@@ -506,16 +1445,14 @@ class HipsImage:
             count = xp['count']
             
             if count == 1:
+                self._x_params_table.append((name, fmt, count, xp['val_or_offset']))
                 self._set_single_x_param(name, fmt, xp['val_or_offset'])
             else:
                 offset = int(xp['val_or_offset'])
-                f.seek(binary_start + offset)
                 data_size = self._get_format_size(fmt) * count
-                padded_size = (data_size + 3) & ~3
-                data = f.read(padded_size)
-                self._set_array_x_param(name, fmt, count, data[:data_size])
-                
-        f.seek(binary_start + byte_offset_total)
+                data = binary_block[offset:offset + data_size]
+                self._x_params_table.append((name, fmt, count, data))
+                self._set_array_x_param(name, fmt, count, data)
 
     def _get_format_size(self, fmt_char: str) -> int:
         return {'b': 1, 's': 2, 'i': 4, 'f': 4, 'd': 8, 'c': 1}.get(fmt_char, 1)
@@ -658,11 +1595,13 @@ class HipsImage:
         elif name == "Quantification":
             self._parse_quantization(str(arr), is_legacy=True)
 
-    def _write_to_handle(self, f):
+    def _write_to_handle(self, f, x_param_entries=None):
         """Internal helper to write the HIPS header to an open file handle.
 
         Args:
             f (io.BufferedWriter): Open file handle in binary write mode.
+            x_param_entries (list, optional): X-param entries to write instead of the
+                ones generated from the metadata.
         """
         f.write(b"HIPS\n")
         f.write(b"\n") # onm
@@ -690,7 +1629,10 @@ class HipsImage:
         f.write(f"{len(desc_bytes)}\n".encode('ascii'))
         f.write(desc_bytes)
         
-        self._write_x_params(f)
+        if x_param_entries is None:
+            self._write_x_params(f)
+        else:
+            self._write_x_param_table(f, x_param_entries)
 
     def write_header(self, path: str):
         """Writes only the HIPS header to a file.
@@ -701,20 +1643,213 @@ class HipsImage:
         with open(path, 'wb') as f:
             self._write_to_handle(f)
 
-    def write(self, path: str, compression: Optional[str] = None):
+    @classmethod
+    def rewrite_header(cls, src: str, dst: Optional[str] = None, **changes) -> 'HipsImage':
+        """Changes metadata of a HIPS file without decoding or re-encoding its pixels.
+
+        A new header and X-param block are written and the pixel payload is copied
+        byte for byte, so the pixels are unchanged even for lossy (JPEG) presets. X-params
+        that are not changed, including ones this module does not interpret (image
+        layers, calibration data, ...), are written back exactly as they were read.
+
+        Args:
+            src (str): Path to the HIPS file.
+            dst (str, optional): Output path. If None or the same file as `src`, `src`
+                is replaced in place via a temporary file in the same folder.
+            **changes: New values for metadata fields: `history`, `description`,
+                `band_names`, `extra_data`, `extra_data_int`, `extra_data_string`,
+                `mm_pixel`, `wavelengths`, `strobe_times`, `strobe_times_universal`,
+                `illumination`, `camera_temperature`, `freehand_layers_xml`,
+                `drawing_primitive_xml`, `id` and the `roi_*` fields.
+
+        Returns:
+            HipsImage: The header of the rewritten file.
+
+        Raises:
+            ValueError: If a field cannot be changed without touching the pixel data, or
+                if a per-band field does not have one entry per band.
+        """
+        invalid = [name for name in changes if name not in _REWRITABLE_FIELDS]
+        if invalid:
+            raise ValueError(f"Cannot rewrite {invalid}; only {list(_REWRITABLE_FIELDS)} can be changed.")
+
+        img = cls.read_header(src)
+        for name in ("wavelengths", "band_names", "strobe_times", "strobe_times_universal"):
+            if name in changes and len(changes[name]) != img.bands:
+                raise ValueError(f"{name} has {len(changes[name])} entries, but the image has "
+                                 f"{img.bands} bands")
+        for name, value in changes.items():
+            setattr(img, name, value)
+
+        # Entries of changed fields are regenerated where the first old one was; every
+        # other X-param is kept verbatim
+        owners = [_REWRITABLE_FIELDS[name] for name in changes if _REWRITABLE_FIELDS[name]]
+        generated = img._x_param_entries()
+        entries = []
+        emitted = set()
+        for entry in img._x_params_table:
+            owner = next((o for o in owners if o(entry[0])), None)
+            if owner is None:
+                entries.append(entry)
+            elif owner not in emitted:
+                entries.extend(e for e in generated if owner(e[0]))
+                emitted.add(owner)
+        for owner in owners:
+            if owner not in emitted:
+                entries.extend(e for e in generated if owner(e[0]))
+
+        # Writing straight into src would truncate the payload before it is copied
+        in_place = dst is None or (os.path.exists(dst) and os.path.samefile(src, dst))
+        target = dst
+        if in_place:
+            fd, target = tempfile.mkstemp(suffix='.hips', dir=os.path.dirname(os.path.abspath(src)))
+            os.close(fd)
+        try:
+            with open(src, 'rb') as fin, open(target, 'wb') as fout:
+                img._write_to_handle(fout, entries)
+                data_offset = fout.tell()
+                fin.seek(img._data_offset)
+                shutil.copyfileobj(fin, fout, 1 << 20)
+            if in_place:
+                shutil.copymode(src, target)
+                os.replace(target, src)
+        except BaseException:
+            if in_place and os.path.exists(target):
+                os.remove(target)
+            raise
+
+        img._path = src if in_place else dst
+        img._data_offset = data_offset
+        img._band_offsets = None
+        return img
+
+    def write(self, path: Union[str, BinaryIO], compression: Optional[str] = None,
+              workers: Optional[int] = None,
+              profile: Union[str, Dict[str, int], None] = None,
+              auto_range: Union[bool, Tuple[float, float], None] = None):
         """Writes the HIPS image (header and pixel data) to a file.
 
         This method handles compression presets and ensures compatibility with
         the legacy Videometer Oracle by promoting certain formats if necessary.
 
         Args:
-            path (str): Target file path.
+            path (str or file object): Target file path, or a writable binary file object
+                (e.g. a BytesIO or socket file). A file object is written sequentially
+                from its current position and is left open.
             compression (str, optional): Compression preset name (e.g., 'Uncompressed',
-                'HighQuality', 'VeryHighCompression'). If None, uses current `format`.
+                'HighQuality', 'VeryHighCompression'). If None, uses current `format`;
+                the default PFBYTE (or PFBYTE_GZ) format then follows the pixel dtype, so
+                uint8, int16, int32, float32 and float64 pixels are stored as PFBYTE,
+                PFSHORT, PFINT, PFFLOAT and PFDOUBLE without conversion.
+            workers (int, optional): Number of threads used to encode the bands
+                concurrently. Quantization is one serial, vectorized pass over the whole
+                cube before the encoding starts. The chunks are still written in band
+                order, so the file is identical to a serial write. Defaults to None
+                (serial encoding).
+            profile (str or dict, optional): Speed/size trade-off of the PNG and GZIP
+                encoders: "fast", "small" (see `COMPRESSION_PROFILES`), or a dict with
+                "compress_level" (0-9) and/or "strategy" (a zlib strategy constant).
+                Defaults to None (the encoder defaults).
+            auto_range (bool or Tuple[float, float], optional): For quantized formats,
+                fit the quantization range of every band to its values instead of the
+                preset's fixed range (see `fit_quantization_ranges`). True uses the band
+                minimum and maximum; a (low, high) pair of percentiles, e.g. (0.1, 99.9),
+                clips outliers. Has no effect on unquantized formats. Defaults to None.
         """
         if self._pixels is None:
             self.load_pixels()
+
+        # Pixels still holding quantized codes can be written as they are when the
+        # quantization is kept; a new preset or range needs the real pixel values.
+        write_codes = bool(self._quantization_parameters) and not self._dequantize
+        if write_codes and (compression is not None or auto_range):
+            scale, offset = self.quantization_scale_offset()
+            band_axis = 0 if self._layout == "bhw" else -1
+            self._pixels = dequantize(self._pixels, scale, offset, band_axis=band_axis)
+            self._dequantize = True
+            write_codes = False
+
+        encoder = self._prepare_write(compression, self._pixels.dtype, profile)
+        is_chunked = bool(self.format & 0x380)
+
+        codes = None
+        if self._quantization_parameters and not write_codes:
+            band_axis = 0 if self._layout == "bhw" else -1
+            if auto_range:
+                percentiles = None if auto_range is True else tuple(auto_range)
+                self._quantization_parameters = fit_quantization_ranges(
+                    self._pixels, self._quantization_parameters, percentiles, band_axis=band_axis)
+                if (self.format & 0x7F) == HipsFormat.PFSHORT and \
+                        max(qp.Q for qp in self._quantization_parameters) <= 8:
+                    # Every fitted band fits in 8 bits: PFSHORT_PNG -> PFBYTE_PNG, etc.
+                    self.format = HipsFormat(self.format - HipsFormat.PFSHORT + HipsFormat.PFBYTE)
+            # Quantize the whole cube in one vectorized pass instead of band by band
+            codes = quantize(self._pixels, self._quantization_parameters, band_axis=band_axis)
+
+        def encode(b):
+            if codes is None:
+                return self._encode_band(encoder, b, self._band_view(b), quantize=False)
+            band_codes = codes[b] if self._layout == "bhw" else codes[:, :, b]
+            return self._encode_band(encoder, b, band_codes, quantize=False)
+
+        def write_bands(f, encoded_bands):
+            for encoded_bytes in encoded_bands:
+                _write_chunk(f, encoded_bytes, is_chunked)
+
+        target = contextlib.nullcontext(path) if hasattr(path, 'write') else open(path, 'wb')
+        with target as f:
+            self._write_to_handle(f)
             
+            if workers is not None and workers > 1 and self.bands > 1:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=min(workers, self.bands)) as executor:
+                    # map() yields in band order, so chunks are written as they finish
+                    write_bands(f, executor.map(encode, range(self.bands)))
+            else:
+                write_bands(f, map(encode, range(self.bands)))
+
+    def to_bytes(self, compression: Optional[str] = None, workers: Optional[int] = None,
+                 profile: Union[str, Dict[str, int], None] = None,
+                 auto_range: Union[bool, Tuple[float, float], None] = None) -> bytes:
+        """Encodes the HIPS image (header and pixel data) in memory.
+
+        The result is the content `write` would put in a file, ready to be stored as a
+        database blob or sent over a network without a temporary file.
+
+        Args:
+            compression (str, optional): Compression preset name. See `write`.
+            workers (int, optional): Number of encoding threads. See `write`.
+            profile (str or dict, optional): Encoder speed/size profile. See `write`.
+            auto_range (bool or Tuple[float, float], optional): Fitted quantization
+                ranges. See `write`.
+
+        Returns:
+            bytes: The encoded HIPS file.
+        """
+        buf = io.BytesIO()
+        self.write(buf, compression, workers=workers, profile=profile, auto_range=auto_range)
+        return buf.getvalue()
+
+    def _prepare_write(self, compression: Optional[str], pixel_dtype,
+                       profile: Union[str, Dict[str, int], None] = None) -> BaseEncoder:
+        """Applies a compression preset to the metadata and returns the band encoder.
+
+        Shared by `write` and `HipsWriter`, so both produce the same format, quantization
+        parameters and chunk encoding.
+
+        Args:
+            compression (str, optional): Compression preset name, or None to keep `format`.
+            pixel_dtype (np.dtype): dtype of the pixel data that will be written.
+            profile (str or dict, optional): A `COMPRESSION_PROFILES` name, or a dict with
+                "compress_level" and/or "strategy", overriding the preset's settings.
+
+        Returns:
+            BaseEncoder: Encoder for the (possibly promoted) output format.
+
+        Raises:
+            ValueError: If `compression` or `profile` is not known.
+        """
+        encoder_options = {}
         if compression is not None:
             preset = COMPRESSION_PRESETS.get(compression)
             if not preset:
@@ -722,6 +1857,7 @@ class HipsImage:
                 
             self.format = preset["format"]
             is_quantized = preset["quantize"]
+            encoder_options.update({k: preset[k] for k in ("compress_level", "strategy") if k in preset})
             
             if is_quantized:
                 q_val = preset["Q"]
@@ -735,11 +1871,11 @@ class HipsImage:
             else:
                 self._quantization_parameters = None
                 self._original_format = None
-        else:
-            # If no compression preset specified, but we are writing float32 pixels to a PFBYTE format, 
-            # we should probably default to PFFLOAT to avoid data loss.
-            if self.format == HipsFormat.PFBYTE and self._pixels.dtype == np.float32:
-                self.format = HipsFormat.PFFLOAT
+        elif (self.format & ~0x80) == HipsFormat.PFBYTE and not self._quantization_parameters:
+            # Without a preset, the default PFBYTE (or PFBYTE_GZ) format follows the pixel
+            # dtype, so integer and double pixels are stored at their own size and float
+            # pixels are not truncated to bytes.
+            self.format = HipsFormat(_native_format(pixel_dtype) | (self.format & 0x80))
 
         # Enforcement: Quantization requires compression for Legacy Oracle de-quantization paths
         is_quantized = self._quantization_parameters is not None
@@ -751,43 +1887,40 @@ class HipsImage:
             else:
                 self.format = HipsFormat.PFSHORT_GZ
 
-        actual_format = self.format & 0x7F
+        if isinstance(profile, str):
+            if profile not in COMPRESSION_PROFILES:
+                raise ValueError(f"Invalid compression profile '{profile}'. "
+                                 f"Must be one of {list(COMPRESSION_PROFILES)}.")
+            profile = COMPRESSION_PROFILES[profile]
+        if profile:
+            encoder_options.update(profile)
+
         is_gz = bool(self.format & 0x80)
         is_jpg = bool(self.format & 0x100)
         is_png = bool(self.format & 0x200)
-        is_chunked = is_gz or is_jpg or is_png
         
         if is_png:
-            encoder = PngEncoder()
+            return PngEncoder(**encoder_options)
         elif is_jpg:
-            encoder = JpegEncoder()
+            return JpegEncoder()
         elif is_gz:
-            dtype = np.uint8 if is_quantized else (np.float32 if actual_format == HipsFormat.PFFLOAT else np.uint8)
-            encoder = GzipEncoder(dtype)
+            # Quantized codes keep their per-band uint8/int16 container
+            return GzipEncoder(None if is_quantized else self._format_dtype(), **encoder_options)
         else:
-            dtype = np.uint8 if is_quantized else (np.float32 if actual_format == HipsFormat.PFFLOAT else np.uint8)
-            encoder = RawEncoder(dtype)
+            return RawEncoder(self._format_dtype())
 
-        with open(path, 'wb') as f:
-            self._write_to_handle(f)
-            
-            if is_chunked:
-                for b in range(self.bands):
-                    band_data = self._pixels[:, :, b]
-                    if is_quantized:
-                        band_data = self._quantize_band(band_data, self._quantization_parameters[b])
-                    
-                    encoded_bytes = encoder.encode_band(band_data)
-                    # Interleaved: write size, then data
-                    f.write(struct.pack('<I', len(encoded_bytes)))
-                    f.write(encoded_bytes)
-            else:
-                # RAW
-                for b in range(self.bands):
-                    band_data = self._pixels[:, :, b]
-                    if is_quantized:
-                        band_data = self._quantize_band(band_data, self._quantization_parameters[b])
-                    f.write(encoder.encode_band(band_data))
+    def _encode_band(self, encoder: BaseEncoder, b: int, band_data: np.ndarray,
+                     quantize: bool = True) -> bytes:
+        """Quantizes band `b` if the image is quantized, and encodes it.
+
+        With ``quantize=False`` `band_data` already holds the codes of a quantized band.
+        """
+        if self._quantization_parameters and quantize:
+            band_data = self._quantize_band(band_data, self._quantization_parameters[b])
+        elif self._quantization_parameters and self._quantization_parameters[b].Q <= 8:
+            # Bands of a mixed-depth cube keep their own 8-bit container
+            band_data = band_data.astype(np.uint8, copy=False)
+        return encoder.encode_band(band_data)
 
     def _quantize_band(self, band_data: np.ndarray, qp: QuantizationParameters) -> np.ndarray:
         max_q = float(2**qp.Q - 1)
@@ -843,8 +1976,15 @@ class HipsImage:
         4. Total Size:
            - The 'byteOffset' line must reflect the total size of the padded binary block.
         """
+        self._write_x_param_table(f, self._x_param_entries())
+
+    def _x_param_entries(self) -> List[Tuple[str, str, int, Union[str, bytes]]]:
+        """Returns the X-params for the current metadata as (name, format, count, value).
+
+        `value` is the literal header string for count == 1, and the unpadded payload
+        bytes for entries stored in the binary block.
+        """
         x_params_to_write = []
-        binary_block = bytearray()
         
         def add_to_list(name, fmt_char, value):
             # Handle Strings ('c')
@@ -855,13 +1995,8 @@ class HipsImage:
                     x_params_to_write.append((name, 'c', 1, val_str))
                 else:
                     # Multi-char string stored in binary block
-                    offset = len(binary_block)
                     data = val_str.encode('ascii', errors='replace')
-                    binary_block.extend(data)
-                    # Strict 4-byte padding
-                    pad = (4 - (len(data) % 4)) % 4
-                    binary_block.extend(b'\0' * pad)
-                    x_params_to_write.append((name, 'c', len(val_str), offset))
+                    x_params_to_write.append((name, 'c', len(val_str), data))
                 return
 
             # Handle Arrays and Numeric Values
@@ -873,14 +2008,9 @@ class HipsImage:
                     x_params_to_write.append((name, fmt_char, 1, str(val)))
                 else:
                     # Numeric array stored in binary block
-                    offset = len(binary_block)
                     dtype_map = {'f': np.float32, 'i': np.int32, 'd': np.float64, 's': np.int16, 'b': np.uint8}
                     data = arr.astype(dtype_map.get(fmt_char, np.float32)).tobytes()
-                    binary_block.extend(data)
-                    # Strict 4-byte padding
-                    pad = (4 - (len(data) % 4)) % 4
-                    binary_block.extend(b'\0' * pad)
-                    x_params_to_write.append((name, fmt_char, len(arr), offset))
+                    x_params_to_write.append((name, fmt_char, len(arr), data))
                 return
 
             # Single numeric values stored in header
@@ -927,11 +2057,27 @@ class HipsImage:
         if len(self.strobe_times) > 0: add_to_list("BandStrobeTime", 'f', self.strobe_times)
         if len(self.strobe_times_universal) > 0: add_to_list("BandStrobeTimesUniversal", 'f', self.strobe_times_universal)
         if len(self.illumination) > 0: add_to_list("BandIllumination", 'f', self.illumination)
-            
+        return x_params_to_write
+
+    @staticmethod
+    def _write_x_param_table(f, entries: List[Tuple[str, str, int, Union[str, bytes]]]):
+        """Writes X-param entries: the parameter lines, then the 4-byte aligned binary block."""
+        lines = []
+        binary_block = bytearray()
+        for name, fmt, count, value in entries:
+            if isinstance(value, (bytes, bytearray)):
+                lines.append((name, fmt, count, len(binary_block)))
+                binary_block.extend(value)
+                # Strict 4-byte padding
+                pad = (4 - (len(value) % 4)) % 4
+                binary_block.extend(b'\0' * pad)
+            else:
+                lines.append((name, fmt, count, value))
+
         # Write nPar
-        f.write(f"{len(x_params_to_write)}\n".encode('ascii'))
+        f.write(f"{len(lines)}\n".encode('ascii'))
         # Write Parameter Lines (Name Format Count Value/Offset)
-        for name, fmt, count, val_or_offset in x_params_to_write:
+        for name, fmt, count, val_or_offset in lines:
             f.write(f"{name} {fmt} {count} {val_or_offset}\n".encode('ascii'))
             
         # Write Byte Offset Line (Total binary block size)
@@ -964,7 +2110,203 @@ class HipsImage:
             lines.append(f"  ID: {self.id}")
         return "\n".join(lines)
 
-def write(image: Union[HipsImage, np.ndarray], path: str, compression: Optional[str] = None):
+def _write_chunk(f, encoded_bytes: bytes, is_chunked: bool):
+    """Appends one encoded band; chunked formats are prefixed with the chunk size."""
+    if is_chunked:
+        # Interleaved: write size, then data
+        f.write(struct.pack('<I', len(encoded_bytes)))
+    f.write(encoded_bytes)
+
+
+class HipsWriter:
+    """Writes a HIPS file band by band, without holding the whole cube in memory.
+
+    The header is written when the writer is created, and every band passed to
+    `write_band` is encoded and appended right away, so peak memory is about one band.
+    Bands may arrive in any order: a band that arrives before the next one due in the
+    file is kept as an encoded chunk until it can be appended. Without a compression
+    preset the bands are written uncompressed in the smallest format holding `dtype`
+    (PFFLOAT for the default float32, PFBYTE for uint8, ...), or in `format` if another
+    format than the default PFBYTE is given.
+
+    Example:
+        >>> with HipsWriter("out.hips", width, height, bands, compression="HighQuality",
+        ...                 wavelengths=wavelengths) as writer:
+        ...     for b in range(bands):
+        ...         writer.write_band(b, acquire_band(b))
+
+    Args:
+        path (str): Target file path.
+        width (int): Image width.
+        height (int): Image height.
+        bands (int): Number of bands that will be written.
+        compression (str, optional): Compression preset name (e.g., 'Uncompressed',
+            'HighQuality', 'VeryHighCompression'). See `HipsImage.write`.
+        profile (str or dict, optional): Encoder speed/size profile. See `HipsImage.write`.
+        dtype (np.dtype, optional): dtype of the bands that will be written, which picks
+            the uncompressed format when no preset is given. Unless the file is
+            quantized, every band must be safely castable to it. Defaults to np.float32.
+        **metadata: Other `HipsImage` fields, e.g. `wavelengths`, `band_names`,
+            `illumination`, `mm_pixel` or `format`.
+    """
+    def __init__(self, path: str, width: int, height: int, bands: int,
+                 compression: Optional[str] = None,
+                 profile: Union[str, Dict[str, int], None] = None,
+                 dtype=np.float32, **metadata):
+        image = HipsImage(width=width, height=height, bands=bands,
+                          roi_width=width, roi_height=height, **metadata)
+        self._start(image, path, compression, profile, np.dtype(dtype))
+
+    @classmethod
+    def _for_image(cls, image: HipsImage, path: str, compression: Optional[str],
+                   profile: Union[str, Dict[str, int], None], pixel_dtype) -> 'HipsWriter':
+        """Creates a writer with the metadata of `image`, for bands of dtype `pixel_dtype`."""
+        writer = cls.__new__(cls)
+        writer._start(image, path, compression, profile, np.dtype(pixel_dtype))
+        return writer
+
+    def _start(self, image: HipsImage, path: str, compression: Optional[str],
+               profile: Union[str, Dict[str, int], None], pixel_dtype):
+        self.image = image
+        self.dtype = np.dtype(pixel_dtype)
+        self._encoder = self.image._prepare_write(compression, pixel_dtype, profile)
+        self._is_chunked = bool(self.image.format & 0x380)
+        self._next_band = 0
+        self._pending: Dict[int, bytes] = {}
+        self._written = set()
+        self._file = open(path, 'wb')
+        try:
+            self.image._write_to_handle(self._file)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def __enter__(self) -> 'HipsWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # Do not mask the original error with the missing-bands check
+            self._file.close()
+            return False
+        self.close()
+        return False
+
+    def write_band(self, b: int, band_data: np.ndarray):
+        """Encodes band `b` and appends it to the file.
+
+        Args:
+            b (int): Band index.
+            band_data (np.ndarray): A 2-D (height, width) array with the band's pixel values.
+
+        Raises:
+            ValueError: If `b` is out of range or was already written, if `band_data`
+                has the wrong shape, or if an unquantized file would not hold its values
+                without loss (its dtype cannot be safely cast to the writer's `dtype`).
+        """
+        if not 0 <= b < self.image.bands:
+            raise ValueError(f"Band index {b} is out of range for {self.image.bands} bands")
+        if b in self._written:
+            raise ValueError(f"Band {b} has already been written")
+        if band_data.shape != (self.image.height, self.image.width):
+            raise ValueError(f"Band {b} has shape {band_data.shape}, expected "
+                             f"{(self.image.height, self.image.width)}")
+        if not self.image._quantization_parameters and not np.can_cast(band_data.dtype, self.dtype, "safe"):
+            # The encoder would cast unsafely, e.g. wrap floats above 255 in a uint8 file
+            raise ValueError(f"Band {b} has dtype {band_data.dtype}, which cannot be stored "
+                             f"without loss in a writer created with dtype {self.dtype}")
+
+        self._append(b, self.image._encode_band(self._encoder, b, band_data))
+
+    def _append(self, b: int, encoded_bytes: bytes):
+        """Writes encoded band `b`, or keeps it until the bands before it are written."""
+        self._written.add(b)
+        if b != self._next_band:
+            self._pending[b] = encoded_bytes
+            return
+        _write_chunk(self._file, encoded_bytes, self._is_chunked)
+        self._next_band += 1
+        while self._next_band in self._pending:
+            _write_chunk(self._file, self._pending.pop(self._next_band), self._is_chunked)
+            self._next_band += 1
+
+    def close(self):
+        """Closes the file and checks that every band was written.
+
+        Raises:
+            ValueError: If some bands were never written.
+        """
+        if self._file.closed:
+            return
+        self._file.close()
+        if self._next_band != self.image.bands:
+            missing = sorted(set(range(self.image.bands)) - self._written)
+            raise ValueError(f"HipsWriter closed before bands {missing} were written")
+
+
+def _bounded_map(executor, fn, items, window: int):
+    """Like `executor.map`, but with at most `window` calls submitted and not yet consumed."""
+    pending = collections.deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def transcode(src: str, dst: str, compression: Optional[str] = None,
+              workers: Optional[int] = None,
+              profile: Union[str, Dict[str, int], None] = None) -> HipsImage:
+    """Re-encodes a HIPS file with another compression preset, one band at a time.
+
+    Each band is decoded with `HipsImage.read_band` and appended to `dst` before the
+    next one is read, so memory stays at a few bands whatever the size of the cube. The
+    output is byte-identical to ``HipsImage.read(src).write(dst, compression)``.
+
+    Args:
+        src (str): Path of the HIPS file to convert.
+        dst (str): Target file path. Must differ from `src`.
+        compression (str, optional): Compression preset name (e.g., 'Uncompressed',
+            'HighQuality', 'HighCompression'). If None, the source format is kept.
+        workers (int, optional): Number of threads decoding and encoding bands
+            concurrently. At most twice that many bands are in flight. Defaults to None
+            (serial).
+        profile (str or dict, optional): Encoder speed/size profile. See `HipsImage.write`.
+
+    Returns:
+        HipsImage: The header of the written file.
+
+    Raises:
+        ValueError: If `dst` is the same file as `src`, or if `compression` or
+            `profile` is not known.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise ValueError("transcode cannot write over its source file.")
+    source = HipsImage.read(src)
+    # The writer gets its own copy of the metadata: the preset rewrites `format` and the
+    # quantization, which `source` still needs to decode the bands.
+    image = copy.copy(source)
+    image._path = None
+    with HipsWriter._for_image(image, dst, compression, profile, source._pixel_dtype()) as writer:
+        def encode(b):
+            return image._encode_band(writer._encoder, b, source.read_band(b))
+
+        if workers is not None and workers > 1 and source.bands > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(workers, source.bands)) as executor:
+                for b, encoded_bytes in enumerate(_bounded_map(executor, encode, range(source.bands),
+                                                               2 * workers)):
+                    writer._append(b, encoded_bytes)
+        else:
+            for b in range(source.bands):
+                writer._append(b, encode(b))
+    return image
+
+
+def write(image: Union[HipsImage, np.ndarray], path: Union[str, BinaryIO], compression: Optional[str] = None,
+          workers: Optional[int] = None, profile: Union[str, Dict[str, int], None] = None,
+          auto_range: Union[bool, Tuple[float, float], None] = None):
     """
     Convenience function to write an image to a HIPS file.
     image can be a HipsImage object or a numpy array.
@@ -972,9 +2314,9 @@ def write(image: Union[HipsImage, np.ndarray], path: str, compression: Optional[
     if isinstance(image, np.ndarray):
         img_obj = HipsImage()
         img_obj.pixels = image
-        img_obj.write(path, compression)
+        img_obj.write(path, compression, workers=workers, profile=profile, auto_range=auto_range)
     else:
-        image.write(path, compression)
+        image.write(path, compression, workers=workers, profile=profile, auto_range=auto_range)
 
 def main():
     import argparse
@@ -983,10 +2325,26 @@ def main():
     parser.add_argument("path", help="Path to the .hips file")
     parser.add_argument("-v", "--verbose", action="store_true", help="Show all parameters and full history")
     parser.add_argument("--history", action="store_true", help="Show full history and description")
+    parser.add_argument("--transcode", metavar="DST",
+                        help="Re-encode the file to DST band by band instead of inspecting it")
+    parser.add_argument("--compression", choices=list(COMPRESSION_PRESETS),
+                        help="Compression preset for --transcode (default: keep the source format)")
+    parser.add_argument("--profile", choices=list(COMPRESSION_PROFILES),
+                        help="Encoder speed/size profile for --transcode")
+    parser.add_argument("--workers", type=int, help="Number of threads for --transcode")
     args = parser.parse_args()
     if not os.path.exists(args.path):
         print(f"Error: File {args.path} not found.")
         sys.exit(1)
+    if args.transcode:
+        try:
+            img = transcode(args.path, args.transcode, args.compression,
+                            workers=args.workers, profile=args.profile)
+        except Exception as e:
+            print(f"Error transcoding HIPS file: {e}")
+            sys.exit(1)
+        print(f"Wrote {args.transcode} ({img.format.name}, {os.path.getsize(args.transcode)} bytes)")
+        return
     try:
         img = HipsImage.read_header(args.path)
         if args.verbose or args.history:
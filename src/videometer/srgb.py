@@ -0,0 +1,332 @@
+"""
+Pure NumPy conversion of spectral (multiband) images to sRGB.
+This module renders reflectance images with the CIE 1931 colour-matching functions and a
+CIE illuminant, without the CLR backend. It is used by `ImageClass.to_sRGB` when the
+'python' backend is active.
+
+The conversion is linear up to the gamma curve, so it is folded into one (bands x 3)
+projection matrix: the cube is rendered with a single (pixels x bands) @ (bands x 3)
+matrix product followed by a table lookup for the sRGB gamma curve.
+
+The projection matrix only depends on the band wavelengths and the illuminant, which are
+the same for every image of an instrument setup, so it is kept in an in-memory LRU cache
+and, if a cache directory is set, on disk across processes.
+"""
+
+import functools
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# CIE 1931 2-degree colour-matching functions x-bar, y-bar, z-bar from 380 nm to 780 nm in
+# 5 nm steps (CIE 15)
+_CMF_WAVELENGTHS = np.arange(380.0, 781.0, 5.0)
+_CMF_X = np.array([
+    0.001368, 0.002236, 0.004243, 0.00765, 0.01431, 0.02319, 0.04351, 0.07763, 0.13438,
+    0.21477, 0.2839, 0.3285, 0.34828, 0.34806, 0.3362, 0.3187, 0.2908, 0.2511, 0.19536,
+    0.1421, 0.09564, 0.05795, 0.03201, 0.0147, 0.0049, 0.0024, 0.0093, 0.0291, 0.06327,
+    0.1096, 0.1655, 0.22575, 0.2904, 0.3597, 0.43345, 0.51205, 0.5945, 0.6784, 0.7621,
+    0.8425, 0.9163, 0.9786, 1.0263, 1.0567, 1.0622, 1.0456, 1.0026, 0.9384, 0.85445,
+    0.7514, 0.6424, 0.5419, 0.4479, 0.3608, 0.2835, 0.2187, 0.1649, 0.1212, 0.0874,
+    0.0636, 0.04677, 0.0329, 0.0227, 0.01584, 0.011359, 0.008111, 0.00579, 0.004109,
+    0.002899, 0.002049, 0.00144, 0.001, 0.00069, 0.000476, 0.000332, 0.000235, 0.000166,
+    0.000117, 0.000083, 0.000059, 0.000042,
+])
+_CMF_Y = np.array([
+    0.000039, 0.000064, 0.00012, 0.000217, 0.000396, 0.00064, 0.00121, 0.00218, 0.004,
+    0.0073, 0.0116, 0.01684, 0.023, 0.0298, 0.038, 0.048, 0.06, 0.0739, 0.09098, 0.1126,
+    0.13902, 0.1693, 0.20802, 0.2586, 0.323, 0.4073, 0.503, 0.6082, 0.71, 0.7932, 0.862,
+    0.91485, 0.954, 0.9803, 0.99495, 1.0, 0.995, 0.9786, 0.952, 0.9154, 0.87, 0.8163,
+    0.757, 0.6949, 0.631, 0.5668, 0.503, 0.4412, 0.381, 0.321, 0.265, 0.217, 0.175,
+    0.1382, 0.107, 0.0816, 0.061, 0.04458, 0.032, 0.0232, 0.017, 0.01192, 0.00821,
+    0.005723, 0.004102, 0.002929, 0.002091, 0.001484, 0.001047, 0.00074, 0.00052,
+    0.000361, 0.000249, 0.000172, 0.00012, 0.000085, 0.00006, 0.000042, 0.00003,
+    0.000021, 0.000015,
+])
+_CMF_Z = np.array([
+    0.00645, 0.01055, 0.02005, 0.03621, 0.06785, 0.1102, 0.2074, 0.3713, 0.6456,
+    1.03905, 1.3856, 1.62296, 1.74706, 1.7826, 1.77211, 1.7441, 1.6692, 1.5281, 1.28764,
+    1.0419, 0.81295, 0.6162, 0.46518, 0.3533, 0.272, 0.2123, 0.1582, 0.1117, 0.07825,
+    0.05725, 0.04216, 0.02984, 0.0203, 0.0134, 0.00875, 0.00575, 0.0039, 0.00275,
+    0.0021, 0.0018, 0.00165, 0.0014, 0.0011, 0.001, 0.0008, 0.0006, 0.00034, 0.00024,
+    0.00019, 0.0001, 0.00005, 0.00003, 0.00002, 0.00001, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+    0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+    0.0, 0.0, 0.0, 0.0,
+])
+
+# CIE daylight basis functions S0, S1, S2 from 380 nm to 780 nm in 10 nm steps (CIE 15)
+_DAYLIGHT_WAVELENGTHS = np.arange(380.0, 781.0, 10.0)
+_DAYLIGHT_S0 = np.array([
+    63.4, 65.8, 94.8, 104.8, 105.9, 96.8, 113.9, 125.6, 125.5, 121.3, 121.3, 113.5, 113.1,
+    110.8, 106.5, 108.8, 105.3, 104.4, 100.0, 96.0, 95.1, 89.1, 90.5, 90.3, 88.4, 84.0,
+    85.1, 81.9, 82.6, 84.9, 81.3, 71.9, 74.3, 76.4, 63.3, 71.7, 77.0, 65.2, 47.7, 68.6,
+    65.0,
+])
+_DAYLIGHT_S1 = np.array([
+    38.5, 35.0, 43.4, 46.3, 43.9, 37.1, 36.7, 35.9, 32.6, 27.9, 24.3, 20.1, 16.2, 13.2,
+    8.6, 6.1, 4.2, 1.9, 0.0, -1.6, -3.5, -3.5, -5.8, -7.2, -8.6, -9.5, -10.9, -10.7,
+    -12.0, -14.0, -13.6, -12.0, -13.3, -12.9, -10.6, -11.6, -12.2, -10.2, -7.8, -11.2,
+    -10.4,
+])
+_DAYLIGHT_S2 = np.array([
+    3.0, 1.2, -1.1, -0.5, -0.7, -1.2, -2.6, -2.9, -2.8, -2.6, -2.6, -1.8, -1.5, -1.3,
+    -1.2, -1.0, -0.5, -0.3, 0.0, 0.2, 0.5, 2.1, 3.2, 4.1, 4.7, 5.1, 6.7, 7.3, 8.6, 9.8,
+    10.2, 8.3, 9.6, 8.5, 7.0, 7.6, 8.0, 6.7, 5.2, 7.4, 6.8,
+])
+
+# Supported illuminants: name -> (kind, correlated colour temperature in K)
+SPECTRA_NAMES = {
+    "A": ("blackbody", 2856.0),
+    "D50": ("daylight", 5003.0),
+    "D55": ("daylight", 5503.0),
+    "D65": ("daylight", 6504.0),
+    "D75": ("daylight", 7504.0),
+    "E": ("equal_energy", None),
+}
+
+# Linear sRGB from CIE XYZ (IEC 61966-2-1)
+_XYZ_TO_SRGB = np.array([
+    [3.2406, -1.5372, -0.4986],
+    [-0.9689, 1.8758, 0.0415],
+    [0.0557, -0.2040, 1.0570],
+])
+
+# Visible range the spectra are integrated over, and the integration step
+VISIBLE_RANGE = (380.0, 780.0)
+_STEP_NM = 1.0
+
+# Projection matrices kept in memory (one per band configuration and illuminant)
+_CACHE_SIZE = 128
+# Part of the on-disk cache key; bump it when the matrix computation changes
+_CACHE_VERSION = 2
+_cache_dir = os.environ.get("VIDEOMETER_SRGB_CACHE_DIR") or None
+
+# Linear values are looked up in a table of this many entries for the gamma curve
+_GAMMA_LUT_SIZE = 1 << 16
+_gamma_lut = None
+
+
+def color_matching_functions(wavelengths) -> np.ndarray:
+    """Returns the CIE 1931 2-degree colour-matching functions at the given wavelengths.
+
+    Args:
+        wavelengths (array-like): Wavelengths in nanometers.
+
+    Returns:
+        np.ndarray: A (N, 3) array with the x-bar, y-bar and z-bar values.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    # Linear interpolation of the tabulated values, zero outside 380-780 nm
+    return np.stack([np.interp(wavelengths, _CMF_WAVELENGTHS, cmf, left=0.0, right=0.0)
+                     for cmf in (_CMF_X, _CMF_Y, _CMF_Z)], axis=-1)
+
+
+def illuminant_spd(spectraName, wavelengths) -> np.ndarray:
+    """Returns the relative spectral power distribution of a CIE illuminant.
+
+    Args:
+        spectraName (str): Name of the illuminant, one of `SPECTRA_NAMES`.
+        wavelengths (array-like): Wavelengths in nanometers.
+
+    Returns:
+        np.ndarray: The spectral power at each wavelength, 100 at 560 nm.
+
+    Raises:
+        NotImplementedError: If `spectraName` is not one of `SPECTRA_NAMES`.
+    """
+    if spectraName not in SPECTRA_NAMES:
+        raise NotImplementedError(
+            'spectraName="' + str(spectraName) + '" is not implemented. \n'
+            "List of implemented spectras: " + str(list(SPECTRA_NAMES))
+        )
+    kind, cct = SPECTRA_NAMES[spectraName]
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+
+    if kind == "equal_energy":
+        return np.full(wavelengths.shape, 100.0)
+
+    if kind == "blackbody":
+        def planck(wl_nm):
+            wl = wl_nm * 1e-9
+            return 1.0 / (wl ** 5 * (np.exp(1.4388e-2 / (wl * cct)) - 1.0))
+        return 100.0 * planck(wavelengths) / planck(560.0)
+
+    # CIE daylight: chromaticity from the CCT, then the S0 + M1 S1 + M2 S2 combination
+    if cct <= 7000:
+        x_d = -4.6070e9 / cct ** 3 + 2.9678e6 / cct ** 2 + 0.09911e3 / cct + 0.244063
+    else:
+        x_d = -2.0064e9 / cct ** 3 + 1.9018e6 / cct ** 2 + 0.24748e3 / cct + 0.237040
+    y_d = -3.000 * x_d ** 2 + 2.870 * x_d - 0.275
+    m = 0.0241 + 0.2562 * x_d - 0.7341 * y_d
+    m1 = (-1.3515 - 1.7703 * x_d + 5.9114 * y_d) / m
+    m2 = (0.0300 - 31.4424 * x_d + 30.0717 * y_d) / m
+    spd = _DAYLIGHT_S0 + m1 * _DAYLIGHT_S1 + m2 * _DAYLIGHT_S2
+    spd = 100.0 * spd / np.interp(560.0, _DAYLIGHT_WAVELENGTHS, spd)
+    return np.interp(wavelengths, _DAYLIGHT_WAVELENGTHS, spd)
+
+
+def set_cache_dir(path):
+    """Sets the directory where projection matrices are cached between processes.
+
+    Each matrix is stored as a small .npy file named after a hash of the wavelengths and
+    the illuminant, so workers rendering images of the same instrument setup compute it
+    only once. The directory can also be set with the VIDEOMETER_SRGB_CACHE_DIR
+    environment variable.
+
+    Args:
+        path (str or None): Cache directory, created if needed. None disables the
+            on-disk cache.
+    """
+    global _cache_dir
+    if path is not None:
+        os.makedirs(path, exist_ok=True)
+    _cache_dir = path
+
+
+def get_cache_dir():
+    """Returns the on-disk cache directory for projection matrices, or None if disabled."""
+    return _cache_dir
+
+
+def clear_cache():
+    """Empties the in-memory projection matrix cache (the on-disk cache is kept)."""
+    _cached_projection_matrix.cache_clear()
+
+
+def projection_matrix(wavelengths, spectraName="D65") -> np.ndarray:
+    """Returns the matrix projecting band reflectances onto linear sRGB.
+
+    The reflectance spectrum of a pixel is interpolated linearly between the band
+    wavelengths (and held constant beyond the outer bands), weighted with the illuminant
+    and the colour-matching functions and integrated over the visible range. All of this
+    is linear in the band values, so it collapses to one (bands x 3) matrix. A 100%
+    reflector renders as the illuminant's white, with Y = 1.
+
+    Matrices are cached by wavelengths and illuminant, in memory (the last
+    `_CACHE_SIZE` configurations) and in the directory set with `set_cache_dir`.
+
+    Args:
+        wavelengths (array-like): Wavelengths of the bands in nanometers.
+        spectraName (str, optional): Illuminant, one of `SPECTRA_NAMES`. Defaults to 'D65'.
+
+    Returns:
+        np.ndarray: A read-only float32 (bands, 3) matrix mapping reflectances in percent
+        to linear sRGB values.
+
+    Raises:
+        NotImplementedError: If `spectraName` is not one of `SPECTRA_NAMES`.
+        ValueError: If no wavelengths are given.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    if wavelengths.ndim != 1 or len(wavelengths) == 0:
+        raise ValueError("At least one band wavelength is needed for the sRGB conversion")
+    if spectraName not in SPECTRA_NAMES:
+        # Raised here so unknown names are not cached
+        illuminant_spd(spectraName, wavelengths)
+    return _cached_projection_matrix(tuple(wavelengths.tolist()), spectraName)
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _cached_projection_matrix(wavelengths, spectraName) -> np.ndarray:
+    path = None
+    if _cache_dir is not None:
+        key = repr((_CACHE_VERSION, wavelengths, spectraName)).encode()
+        path = os.path.join(_cache_dir, "srgb_" + hashlib.sha1(key).hexdigest() + ".npy")
+        try:
+            matrix = np.load(path)
+        except (OSError, ValueError):
+            matrix = None
+        if matrix is not None and matrix.shape == (len(wavelengths), 3):
+            matrix.setflags(write=False)
+            return matrix
+
+    matrix = _compute_projection_matrix(np.array(wavelengths), spectraName)
+    if path is not None:
+        # Write to a temporary file first so concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=_cache_dir, suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, matrix)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _compute_projection_matrix(wavelengths: np.ndarray, spectraName: str) -> np.ndarray:
+    """Integrates the illuminant-weighted colour-matching functions; see `projection_matrix`."""
+    grid = np.arange(VISIBLE_RANGE[0], VISIBLE_RANGE[1] + _STEP_NM / 2, _STEP_NM)
+    weights = illuminant_spd(spectraName, grid)[:, None] * color_matching_functions(grid)
+    white_y = weights[:, 1].sum()
+
+    # Interpolation weights of every band at every grid wavelength, (grid, bands)
+    order = np.argsort(wavelengths, kind="stable")
+    interpolation = np.zeros((len(grid), len(wavelengths)))
+    identity = np.eye(len(wavelengths))
+    for i, band in enumerate(order):
+        interpolation[:, band] = np.interp(grid, wavelengths[order], identity[i])
+
+    xyz = interpolation.T @ weights / white_y
+    # Reflectance is given in percent
+    return (xyz @ _XYZ_TO_SRGB.T / 100.0).astype(np.float32)
+
+
+def _get_gamma_lut() -> np.ndarray:
+    """Returns the uint8 sRGB gamma table indexed by linear values in [0, 1]."""
+    global _gamma_lut
+    if _gamma_lut is None:
+        linear = np.linspace(0.0, 1.0, _GAMMA_LUT_SIZE)
+        encoded = np.where(linear <= 0.0031308, 12.92 * linear,
+                           1.055 * np.power(linear, 1 / 2.4) - 0.055)
+        _gamma_lut = np.round(encoded * 255).astype(np.uint8)
+    return _gamma_lut
+
+
+def linear_to_srgb8(linear: np.ndarray) -> np.ndarray:
+    """Applies the sRGB gamma curve to linear values and quantizes them to 8 bits.
+
+    Args:
+        linear (np.ndarray): Linear sRGB values; values outside [0, 1] are clipped and
+            NaN is rendered as 0.
+
+    Returns:
+        np.ndarray: uint8 array of the same shape.
+    """
+    index = np.multiply(linear, _GAMMA_LUT_SIZE - 1, dtype=np.float32)
+    # fmax/fmin (unlike clip) also map NaN into the table
+    np.fmax(index, 0, out=index)
+    np.fmin(index, _GAMMA_LUT_SIZE - 1, out=index)
+    index += 0.5
+    return _get_gamma_lut()[index.astype(np.intp)]
+
+
+def spectral_to_srgb(pixels: np.ndarray, wavelengths, spectraName="D65") -> np.ndarray:
+    """Renders a reflectance-calibrated spectral image as an 8-bit sRGB image.
+
+    Args:
+        pixels (np.ndarray): (height, width, bands) reflectances in percent.
+        wavelengths (array-like): Wavelength of every band in nanometers.
+        spectraName (str, optional): Illuminant, one of `SPECTRA_NAMES`. Defaults to 'D65'.
+
+    Returns:
+        np.ndarray: A (height, width, 3) uint8 sRGB image.
+
+    Raises:
+        NotImplementedError: If `spectraName` is not one of `SPECTRA_NAMES`.
+        ValueError: If the number of wavelengths does not match the number of bands.
+    """
+    if pixels.ndim != 3 or pixels.shape[2] != len(wavelengths):
+        raise ValueError(
+            f"Expected a (height, width, {len(wavelengths)}) image, got shape {pixels.shape}"
+        )
+    matrix = projection_matrix(wavelengths, spectraName)
+    height, width, bands = pixels.shape
+    flat = pixels.reshape(height * width, bands)
+    if flat.dtype != np.float32:
+        flat = flat.astype(np.float32)
+    linear = flat @ matrix
+    return linear_to_srgb8(linear).reshape(height, width, 3)
@@ -83,10 +83,10 @@ def setFreehandLayers(VMImageObject, ImageClass):
     from videometer import vm_utils_clr
     return vm_utils_clr.setFreehandLayers(VMImageObject, ImageClass)
 
-def vmImage2npArray(vmImage):
-    """Converts a CLR VMImage object to a 3-D NumPy array. (CLR only)"""
+def vmImage2npArray(vmImage, bandIndexes=None, layout="hwb", dtype=np.float32):
+    """Converts a CLR VMImage object (optionally only some bands) to a 3-D NumPy array. (CLR only)"""
     from videometer import vm_utils_clr
-    return vm_utils_clr.vmImage2npArray(vmImage)
+    return vm_utils_clr.vmImage2npArray(vmImage, bandIndexes, layout, dtype)
 
 def asNetArrayMemMove(npArray):
     """Converts a NumPy array to a CLR array using memory move. (CLR only)"""
@@ -116,10 +116,13 @@ def illuminationList2Objects(illuminationList):
     return np.array(illuminationObjects)
 
 
-def asNumpyArray(netArray):
+def asNumpyArray(netArray, copy=True):
     """
     Given a CLR `System.Array` returns a `numpy.ndarray`.  See _MAP_NET_NP for
     the mapping of CLR types to Numpy dtypes.
+
+    With copy=False the array is a view of the .NET memory, which is only valid while
+    `netArray` is alive; it saves a copy when the values are converted right away.
     """
     _MAP_NET_NP = {"Single": np.float32, "Int32": np.int32, "Byte": np.uint8}
 
@@ -135,7 +138,7 @@ def asNumpyArray(netArray):
         dims[I] = netArray.GetLength(I)
 
     # Take in any dimensions of array and iterate through it in one for loop
-    npArray = np.ctypeslib.as_array(netArray, shape=dims).astype(_MAP_NET_NP[netType])
+    npArray = np.ctypeslib.as_array(netArray, shape=dims).astype(_MAP_NET_NP[netType], copy=copy)
 
     return npArray
 
@@ -232,15 +235,28 @@ def setFreehandLayers(VMImageObject, ImageClass):
     return VMImageObject
 
 
-def vmImage2npArray(vmImage):
+def vmImage2npArray(vmImage, bandIndexes=None, layout="hwb", dtype=np.float32):
     height = vmImage.Height
     width = vmImage.Width
-    bands = vmImage.Bands
-
-    npArray = np.empty((height, width, bands))
-    for b in range(bands):
-        bandLayer = VMIm.ImagePixelAccess.GetValues(vmImage, b)
-        npArray[:, :, b] = asNumpyArray(bandLayer).reshape(height, width)
+    if bandIndexes is None:
+        bandIndexes = range(vmImage.Bands)
+    if dtype is None:
+        # VMImage bands are stored as float32
+        dtype = np.float32
+
+    # "bhw" keeps every band contiguous, matching the band-wise VMImage storage
+    if layout == "bhw":
+        npArray = np.empty((len(bandIndexes), height, width), dtype=dtype)
+    else:
+        npArray = np.empty((height, width, len(bandIndexes)), dtype=dtype)
+    for i, b in enumerate(bandIndexes):
+        bandLayer = VMIm.ImagePixelAccess.GetValues(vmImage, int(b))
+        # Converted once, from the .NET buffer straight into npArray
+        band = asNumpyArray(bandLayer, copy=False).reshape(height, width)
+        if layout == "bhw":
+            npArray[i] = band
+        else:
+            npArray[:, :, i] = band
 
     vmImage.Free()
 
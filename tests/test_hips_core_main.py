@@ -1,7 +1,9 @@
 import pytest
+import io
 import os
+import shutil
 import numpy as np
-from videometer.hips_core import HipsImage, write as pure_write
+from videometer.hips_core import HipsFormat, HipsImage, HipsWriter, QuantizationParameters, dequantize, quantize, transcode, write as pure_write
 
 # Setup paths
 testImagesDir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "TestImages"))
@@ -109,6 +111,151 @@ class TestHipsCoreRead:
         np.testing.assert_array_equal(img_reduced.strobe_times, [19, 1])
         assert img_reduced.illumination_names == ["Mixed", "NA"]
 
+    def test_ReadSelectedBands(self):
+        bands_to_use = [18, 3, 3]
+        img_selected = HipsImage.read(self.imagePath, band_indexes=bands_to_use)
+
+        assert img_selected.bands == 3
+        assert img_selected.band_names == ["BandName19", "BandName4", "BandName4"]
+        np.testing.assert_array_equal(img_selected.pixels, self.img.pixels[:, :, bands_to_use])
+
+    def test_ReadBand(self):
+        img_lazy = HipsImage.read(self.imagePath)
+        for b in [18, 0, 7]:
+            np.testing.assert_array_equal(img_lazy.read_band(b), self.img.pixels[:, :, b])
+        assert img_lazy._pixels is None
+
+    def test_ReadWithWorkers(self):
+        img_threaded = HipsImage.read(self.imagePath, workers=4)
+        np.testing.assert_array_equal(img_threaded.pixels, self.img.pixels)
+
+    def test_ReadBandMajorLayout(self):
+        img_bhw = HipsImage.read(self.imagePath, layout="bhw")
+        assert img_bhw.pixels.shape == (img_bhw.bands, img_bhw.height, img_bhw.width)
+        assert img_bhw.pixels.flags.c_contiguous
+        np.testing.assert_array_equal(img_bhw.pixels, self.img.pixels.transpose(2, 0, 1))
+
+    def test_ReadQuantizedCodes(self, filename):
+        img_codes = HipsImage.read(self.imagePath, dequantize=False)
+        scale_offset = img_codes.quantization_scale_offset()
+        if "Uncompressed" in filename:
+            assert scale_offset is None
+            return
+
+        assert img_codes.pixels.dtype in (np.uint8, np.int16)
+        scale, offset = scale_offset
+        assert scale.shape == offset.shape == (img_codes.bands,)
+        np.testing.assert_array_equal(dequantize(img_codes.pixels, scale, offset), self.img.pixels)
+
+    def test_LoadPixelsIntoBuffer(self):
+        buffer = np.empty(self.img.pixels.shape, dtype=np.float32)
+        img = HipsImage.read(self.imagePath)
+        img.load_pixels(out=buffer)
+        assert img.pixels is buffer
+        np.testing.assert_array_equal(buffer, self.img.pixels)
+
+        half = np.empty(self.img.pixels.shape, dtype=np.float16)
+        HipsImage.read(self.imagePath).load_pixels(out=half)
+        np.testing.assert_allclose(half, self.img.pixels.astype(np.float16), rtol=1e-3)
+
+        with pytest.raises(ValueError):
+            HipsImage.read(self.imagePath).load_pixels(out=np.empty((1, 1, 1), dtype=np.float32))
+
+    def test_ReadFromBuffer(self):
+        with open(self.imagePath, 'rb') as f:
+            data = f.read()
+        img = HipsImage.from_buffer(memoryview(data))
+        assert img.band_names == self.img.band_names
+        np.testing.assert_array_equal(img.pixels, self.img.pixels)
+
+        with open(self.imagePath, 'rb') as f:
+            img = HipsImage.read(f, band_indexes=[3])
+            np.testing.assert_array_equal(img.pixels, self.img.pixels[:, :, [3]])
+
+    def test_WriteWithWorkers(self, tmp_path):
+        serial_path = tmp_path / "serial.hips"
+        parallel_path = tmp_path / "parallel.hips"
+        HipsImage.read(self.imagePath).write(str(serial_path))
+        HipsImage.read(self.imagePath).write(str(parallel_path), workers=4)
+        assert serial_path.read_bytes() == parallel_path.read_bytes()
+
+    def test_WriteProfiles(self, tmp_path):
+        expected = tmp_path / "default.hips"
+        HipsImage.read(self.imagePath).write(str(expected), compression="HighQuality")
+        for profile in ("fast", "small", {"compress_level": 3}):
+            output_path = tmp_path / "profile.hips"
+            HipsImage.read(self.imagePath).write(str(output_path), compression="HighQuality", profile=profile)
+            np.testing.assert_array_equal(HipsImage.read(str(output_path)).pixels,
+                                          HipsImage.read(str(expected)).pixels)
+
+        with pytest.raises(ValueError):
+            HipsImage.read(self.imagePath).write(str(tmp_path / "bad.hips"), profile="unknown")
+
+    def test_WriteToBytes(self, tmp_path):
+        output_path = tmp_path / "file.hips"
+        HipsImage.read(self.imagePath).write(str(output_path), compression="HighQuality")
+        data = HipsImage.read(self.imagePath).to_bytes(compression="HighQuality")
+        assert data == output_path.read_bytes()
+
+        stream = io.BytesIO()
+        HipsImage.read(self.imagePath).write(stream, compression="HighQuality")
+        assert stream.getvalue() == data
+        np.testing.assert_array_equal(HipsImage.from_buffer(data).pixels,
+                                      HipsImage.read(str(output_path)).pixels)
+
+    def test_RewriteHeader(self, tmp_path):
+        output_path = str(tmp_path / "relabelled.hips")
+        band_names = [f"Band {b}" for b in range(self.img.bands)]
+        HipsImage.rewrite_header(self.imagePath, output_path, history="Relabelled", band_names=band_names)
+
+        img = HipsImage.read(output_path)
+        assert img.history == "Relabelled"
+        assert img.band_names == band_names
+        assert img.extra_data_string == self.img.extra_data_string
+        # X-params that were not changed (including image layers) are kept verbatim
+        unchanged = [entry for entry in self.img._x_params_table if not entry[0].startswith("BandName")]
+        assert [entry for entry in img._x_params_table if not entry[0].startswith("BandName")] == unchanged
+        np.testing.assert_array_equal(img.pixels, self.img.pixels)
+
+        with pytest.raises(ValueError):
+            HipsImage.rewrite_header(self.imagePath, output_path, bands=3)
+        for name, value in [("wavelengths", np.array([1.0, 2.0, 3.0])), ("band_names", ["a"]),
+                            ("strobe_times", [1]), ("strobe_times_universal", [1])]:
+            with pytest.raises(ValueError):
+                HipsImage.rewrite_header(self.imagePath, str(tmp_path / "mismatch.hips"), **{name: value})
+        assert not os.path.exists(tmp_path / "mismatch.hips")
+
+        # dst naming the source file rewrites it in place instead of truncating it
+        copy_path = str(tmp_path / "copy.hips")
+        shutil.copyfile(self.imagePath, copy_path)
+        HipsImage.rewrite_header(copy_path, copy_path, history="In place")
+        img = HipsImage.read(copy_path)
+        assert img.history == "In place"
+        np.testing.assert_array_equal(img.pixels, self.img.pixels)
+
+    def test_Transcode(self, tmp_path):
+        for compression in ("Uncompressed", "HighQuality", "HighCompression"):
+            expected = tmp_path / "expected.hips"
+            HipsImage.read(self.imagePath).write(str(expected), compression=compression)
+            output_path = tmp_path / "transcoded.hips"
+            transcode(self.imagePath, str(output_path), compression, workers=2)
+            assert output_path.read_bytes() == expected.read_bytes()
+
+        with pytest.raises(ValueError):
+            transcode(str(output_path), str(output_path))
+
+    def test_ReadWindow(self):
+        img = HipsImage.read(self.imagePath)
+        window = img.read_window(1, 1, 1, 2, bands=[0, 5])
+        np.testing.assert_array_equal(window, self.img.pixels[1:2, 1:3, [0, 5]])
+
+        img_bhw = HipsImage.read(self.imagePath, layout="bhw")
+        np.testing.assert_array_equal(img_bhw.read_window(0, 1, 2, 2),
+                                      self.img.pixels[0:2, 1:3].transpose(2, 0, 1))
+
+        with pytest.raises(ValueError):
+            img.read_window(1, 0, 2, 1)
+
 def test_WriteNpArray(tmp_path):
     arr = np.zeros((2, 3, 19), dtype=np.float32)
     arr[:, :, 0] = np.array([[0, 1, 2], [3, 4, 5]], dtype=np.float32)
@@ -122,3 +269,282 @@ def test_WriteNpArray(tmp_path):
     
     img_read = HipsImage.read(str(output_path))
     np.testing.assert_allclose(img_read.pixels, arr)
+
+def test_ReadMmap():
+    path = os.path.join(testImagesDir, "TestEverythingImage_Uncompressed.hips")
+    expected = HipsImage.read(path).pixels
+
+    img = HipsImage.read(path, mmap=True)
+    assert isinstance(img.pixels, np.memmap)
+    assert not img.pixels.flags.writeable
+    assert img.pixels.shape == (img.height, img.width, img.bands)
+    np.testing.assert_array_equal(img.pixels, expected)
+
+def test_ReadMmapCompressedFallsBack():
+    path = os.path.join(testImagesDir, "TestEverythingImage_HighQuality.hips")
+    img = HipsImage.read(path, mmap=True)
+    assert not isinstance(img.pixels, np.memmap)
+    np.testing.assert_array_equal(img.pixels, HipsImage.read(path).pixels)
+
+def test_ReadWindowGzip(tmp_path):
+    rng = np.random.default_rng(0)
+    img = HipsImage(width=40, height=30, bands=3)
+    img.pixels = (rng.random((30, 40, 3)) * 100).astype(np.float32)
+    img._quantization_parameters = [QuantizationParameters(Q=8, Q_Min=0.0, Q_Max=120.0) for _ in range(3)]
+    output_path = str(tmp_path / "Window_Gz.hips")
+    img.write(output_path)
+
+    img_read = HipsImage.read(output_path)
+    assert img_read.format & 0x80
+    expected = HipsImage.read(output_path).pixels
+    np.testing.assert_array_equal(img_read.read_window(5, 7, 10, 20, bands=[2]), expected[5:15, 7:27, [2]])
+
+def test_WriteMixedDepthCodesGzip():
+    rng = np.random.default_rng(0)
+    img = HipsImage(width=7, height=6, bands=2)
+    img.pixels = (rng.random((6, 7, 2)) * 100).astype(np.float32)
+    img.format = HipsFormat.PFSHORT_GZ
+    img._quantization_parameters = [QuantizationParameters(Q=8, Q_Min=0.0, Q_Max=100.0),
+                                    QuantizationParameters(Q=12, Q_Min=0.0, Q_Max=100.0)]
+    data = img.to_bytes()
+
+    # The 8-bit band of the code cube is written back in its uint8 container
+    rewritten = HipsImage.from_buffer(data, dequantize=False).to_bytes()
+    assert rewritten == data
+    np.testing.assert_array_equal(HipsImage.from_buffer(rewritten).pixels, HipsImage.from_buffer(data).pixels)
+
+def test_ReadHeaderGrowsBuffer(monkeypatch):
+    from videometer import hips_core
+    path = os.path.join(testImagesDir, "TestEverythingImage_HighQuality.hips")
+    expected = HipsImage.read_header(path)
+
+    # A header larger than the first read is parsed after reading more of the file
+    monkeypatch.setattr(hips_core, "_HEADER_READ_SIZE", 16)
+    img = HipsImage.read_header(path)
+    assert img._data_offset == expected._data_offset
+    assert img.band_names == expected.band_names
+    np.testing.assert_array_equal(img.wavelengths, expected.wavelengths)
+    np.testing.assert_array_equal(img.pixels, expected.pixels)
+
+def test_ImageClassLazy(monkeypatch):
+    from videometer import config, hips
+    monkeypatch.setattr(config, "_BACKEND", "python")
+    path = os.path.join(testImagesDir, "TestEverythingImage_HighQuality.hips")
+    expected = hips.read(path)
+
+    img = hips.read(path, lazy=True)
+    np.testing.assert_array_equal(img.WaveLengths, expected.WaveLengths)
+    assert img.ExtraData == expected.ExtraData
+    assert img._lazyHipsImage._pixels is None
+    np.testing.assert_array_equal(img.PixelValues, expected.PixelValues)
+
+    img_reduced = hips.read(path, lazy=True)
+    img_reduced.reduceBands([1, 3])
+    assert img_reduced.Bands == 2
+    np.testing.assert_array_equal(img_reduced.PixelValues, expected.PixelValues[:, :, [1, 3]])
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_ReadMany(monkeypatch, executor):
+    from videometer import config, hips
+    monkeypatch.setattr(config, "_BACKEND", "python")
+    paths = [os.path.join(testImagesDir, name) for name in namesOfTestEverythingImages]
+    paths.insert(2, os.path.join(testImagesDir, "missing.hips"))
+    expected = [hips.read(path, [0, 2]).PixelValues for path in paths if os.path.isfile(path)]
+
+    images, errors = hips.read_many(paths, [0, 2], workers=2, executor=executor)
+    assert [error is None for error in errors] == [True, True, False, True, True, True]
+    assert isinstance(errors[2], FileNotFoundError)
+    assert images[2] is None
+    for image, pixels in zip([img for img in images if img is not None], expected):
+        assert image.Bands == 2
+        np.testing.assert_array_equal(image.PixelValues, pixels)
+
+    stacked, errors = hips.read_many(paths + [os.path.join(testImagesDir, "2DGaussianSideBySide.hips")],
+                                     [0, 2], workers=2, executor=executor, stack=True)
+    assert stacked.shape == (7,) + expected[0].shape
+    assert isinstance(errors[2], FileNotFoundError)
+    assert isinstance(errors[6], ValueError)
+    assert stacked.dtype == np.float32
+    assert not stacked[[2, 6]].any()
+    np.testing.assert_array_equal(np.delete(stacked, [2, 6], axis=0), np.stack(expected))
+
+    # The stack is allocated in the requested dtype
+    for dtype in (np.float16, np.int16):
+        stacked, errors = hips.read_many(paths, [0, 2], workers=2, executor=executor, stack=True, dtype=dtype)
+        assert stacked.dtype == dtype
+        np.testing.assert_array_equal(np.delete(stacked, 2, axis=0), np.stack(expected).astype(dtype))
+
+def test_ForegroundPixelsTable(monkeypatch):
+    from videometer import config, hips
+    monkeypatch.setattr(config, "_BACKEND", "python")
+    path = os.path.join(testImagesDir, "2DGaussianSideBySide.hips")
+    cube = HipsImage.read(path).pixels
+    mask = np.zeros(cube.shape[:2], dtype=np.uint8)
+    mask[10:20, 30:45] = 1
+    mask[40, 5] = 255
+    rows, cols = np.nonzero(mask)
+
+    for image in (HipsImage.read(path), HipsImage.read(path, layout="bhw")):
+        # Streamed band by band from the file, then gathered from the loaded cube
+        for _ in range(2):
+            table, coordinates = image.foreground_pixels_table(mask)
+            assert table.flags.c_contiguous
+            np.testing.assert_array_equal(table, cube[rows, cols])
+            np.testing.assert_array_equal(coordinates, np.stack([rows, cols], axis=1))
+            image.load_pixels()
+    for layout in ("hwb", "bhw"):
+        image = HipsImage.read(path, layout=layout)
+        image.load_pixels()
+        table, _ = image.foreground_pixels_table(mask, bands=[cube.shape[2] - 1])
+        np.testing.assert_array_equal(table, cube[rows, cols][:, -1:])
+
+    for img in (hips.read(path), hips.read(path, layout="bhw"), hips.read(path, lazy=True)):
+        with pytest.raises(ValueError):
+            img.foreground_pixels_table()
+        img.ForegroundPixels = mask
+        table, coordinates = img.foreground_pixels_table()
+        np.testing.assert_array_equal(table, cube[rows, cols])
+        np.testing.assert_array_equal(coordinates[:, 0], rows)
+        table, _ = img.foreground_pixels_table(bandIndexesToUse=[0])
+        np.testing.assert_array_equal(table, cube[rows, cols][:, :1])
+    with pytest.raises(ValueError):
+        img.foreground_pixels_table(mask[1:])
+
+def test_ReadDtype(tmp_path, monkeypatch):
+    from videometer import config, hips
+    monkeypatch.setattr(config, "_BACKEND", "python")
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 256, (4, 5, 3)).astype(np.uint8)
+    path = str(tmp_path / "bytes.hips")
+    pure_write(arr, path, compression=None)
+
+    img = hips.read(path)
+    assert img.PixelValues.dtype == np.float32
+    np.testing.assert_array_equal(img.PixelValues, arr)
+    assert hips.read(path, dtype=None).PixelValues.dtype == np.uint8
+    assert hips.read(path, lazy=True, dtype=np.float64).PixelValues.dtype == np.float64
+    assert hips.read(path, layout="bhw", dtype=np.float16).PixelValues.shape == (3, 4, 5)
+    assert hips.readOnlyPixelValues(path).dtype == np.float32
+    assert hips.readOnlyPixelValues(path, dtype=np.int32).dtype == np.int32
+
+    # Quantized files are de-quantized first and cast like raw files
+    quantized_path = os.path.join(testImagesDir, "TestEverythingImage_HighQuality.hips")
+    expected = hips.read(quantized_path).PixelValues
+    for dtype in (np.uint8, np.int16):
+        pixels = hips.read(quantized_path, dtype=dtype).PixelValues
+        assert pixels.dtype == dtype
+        np.testing.assert_array_equal(pixels, expected.astype(dtype))
+    assert hips.readOnlyPixelValues(quantized_path, dtype=np.int16).dtype == np.int16
+
+    # Written back in the file's own format, since the float32 values are whole bytes
+    out_path = str(tmp_path / "copy.hips")
+    hips.write(img, out_path)
+    assert (HipsImage.read_header(out_path).format & 0x7F) == HipsFormat.PFBYTE
+    img.PixelValues = img.PixelValues + np.float32(0.5)
+    hips.write(img, out_path)
+    assert (HipsImage.read_header(out_path).format & 0x7F) == HipsFormat.PFFLOAT
+
+def test_HipsWriter(tmp_path):
+    rng = np.random.default_rng(0)
+    arr = (rng.random((4, 5, 3)) * 100).astype(np.float32)
+    wavelengths = np.array([400, 500, 600], dtype=np.float32)
+
+    expected_path = tmp_path / "expected.hips"
+    expected = HipsImage(wavelengths=wavelengths)
+    expected.pixels = arr
+    expected.write(str(expected_path), compression="HighQuality")
+
+    output_path = tmp_path / "streamed.hips"
+    with HipsWriter(str(output_path), 5, 4, 3, compression="HighQuality", wavelengths=wavelengths) as writer:
+        for b in (2, 0, 1):
+            writer.write_band(b, arr[:, :, b])
+    assert output_path.read_bytes() == expected_path.read_bytes()
+
+    with pytest.raises(ValueError):
+        with HipsWriter(str(tmp_path / "incomplete.hips"), 5, 4, 3) as writer:
+            writer.write_band(0, arr[:, :, 0])
+
+def test_HipsWriterNativeDtype(tmp_path):
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 256, (4, 5, 2)).astype(np.uint8)
+    output_path = str(tmp_path / "bytes.hips")
+    with HipsWriter(output_path, 5, 4, 2, dtype=np.uint8) as writer:
+        for b in range(2):
+            writer.write_band(b, arr[:, :, b])
+
+    img_read = HipsImage.read(output_path)
+    assert img_read.format == HipsFormat.PFBYTE
+    assert img_read.pixels.dtype == np.uint8
+    np.testing.assert_array_equal(img_read.pixels, arr)
+
+    with pytest.raises(ValueError):
+        with HipsWriter(str(tmp_path / "mismatch.hips"), 5, 4, 1, dtype=np.uint8) as writer:
+            writer.write_band(0, np.full((4, 5), 300.0))
+
+@pytest.mark.parametrize("dtype, expected_format", [
+    (np.uint8, HipsFormat.PFBYTE),
+    (np.int16, HipsFormat.PFSHORT),
+    (np.int32, HipsFormat.PFINT),
+    (np.float32, HipsFormat.PFFLOAT),
+    (np.float64, HipsFormat.PFDOUBLE),
+])
+def test_WriteNativeDtype(tmp_path, dtype, expected_format):
+    arr = (np.arange(4 * 5 * 3).reshape(4, 5, 3) * 7 - 50).astype(dtype)
+    for pixel_format in (HipsFormat.PFBYTE, HipsFormat.PFBYTE_GZ):
+        output_path = str(tmp_path / "native.hips")
+        img = HipsImage(format=pixel_format)
+        img.pixels = arr
+        img.write(output_path)
+
+        img_read = HipsImage.read(output_path)
+        assert img_read.format == expected_format | (pixel_format & 0x80)
+        assert img_read.pixels.dtype == dtype
+        np.testing.assert_array_equal(img_read.pixels, arr)
+        if not pixel_format & 0x80:
+            # Stored at the native size, not widened to float
+            assert os.path.getsize(output_path) - img_read._data_offset == arr.nbytes
+
+def test_WriteAutoRange(tmp_path):
+    rng = np.random.default_rng(0)
+    arr = (rng.random((20, 30, 3)) * [4.0, 50.0, 150.0]).astype(np.float32)
+    preset_path = str(tmp_path / "preset.hips")
+    fitted_path = str(tmp_path / "fitted.hips")
+    pure_write(arr, preset_path, compression="VeryHighQuality")
+    pure_write(arr, fitted_path, compression="VeryHighQuality", auto_range=True)
+
+    preset = HipsImage.read(preset_path)
+    fitted = HipsImage.read(fitted_path)
+    # The dim band needs fewer bits on the same grid; the bright band gets its own range
+    assert [qp.Q for qp in fitted._quantization_parameters] == [8, 11, 12]
+    assert fitted._quantization_parameters[2].Q_Max == pytest.approx(arr[:, :, 2].max(), rel=1e-5)
+    step = 120.0 / (2**12 - 1)
+    np.testing.assert_allclose(fitted.pixels[:, :, :2], preset.pixels[:, :, :2], atol=step + 1e-4)
+    assert np.abs(fitted.pixels - arr).max() <= np.abs(preset.pixels - arr).max()
+    assert np.abs(fitted.pixels[:, :, :2] - arr[:, :, :2]).max() <= step / 2 + 1e-4
+
+    assert fitted.format == HipsFormat.PFSHORT_PNG
+
+    # Only 8-bit bands left: stored as PFBYTE_PNG
+    pure_write(arr[:, :, :1], fitted_path, compression="VeryHighQuality", auto_range=True)
+    assert HipsImage.read(fitted_path).format == HipsFormat.PFBYTE_PNG
+
+    arr[0, 0, 1] = 1000.0
+    pure_write(arr, fitted_path, compression="HighQuality", auto_range=(0.0, 99.0))
+    qp = HipsImage.read(fitted_path)._quantization_parameters[1]
+    assert qp.Q_Max < 100.0  # the outlier is clipped instead of stretching the range
+
+def test_QuantizeMatchesPerBand():
+    rng = np.random.default_rng(0)
+    cube = (rng.random((20, 30, 4)) * 140 - 10).astype(np.float32)
+    q_params = [QuantizationParameters(Q=8, Q_Min=0.0, Q_Max=120.0),
+                QuantizationParameters(Q=12, Q_Min=-3.3, Q_Max=50.1),
+                QuantizationParameters(Q=10, Q_Min=0.5, Q_Max=99.9),
+                QuantizationParameters(Q=10, Q_Min=3.0, Q_Max=3.0)]
+    img = HipsImage()
+    expected = [img._quantize_band(cube[:, :, b], q_params[b]) for b in range(4)]
+
+    codes = quantize(cube, q_params)
+    codes_bhw = quantize(np.ascontiguousarray(cube.transpose(2, 0, 1)), q_params, band_axis=0)
+    for b in range(4):
+        np.testing.assert_array_equal(codes[:, :, b], expected[b])
+        np.testing.assert_array_equal(codes_bhw[b], expected[b])
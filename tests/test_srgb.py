@@ -0,0 +1,90 @@
+import functools
+import os
+import numpy as np
+import pytest
+from videometer import srgb
+
+testImagesDir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "TestImages"))
+
+
+def test_ColorMatchingFunctions():
+    wavelengths = np.arange(380.0, 781.0)
+    cmf = srgb.color_matching_functions(wavelengths)
+    assert cmf.shape == (len(wavelengths), 3)
+    # y-bar is the photopic luminosity curve, peaking at about 555 nm
+    assert abs(wavelengths[np.argmax(cmf[:, 1])] - 555) <= 5
+    assert cmf[:, 1].max() == pytest.approx(1.0, abs=0.02)
+
+
+@pytest.mark.parametrize("spectraName", list(srgb.SPECTRA_NAMES))
+def test_IlluminantNormalization(spectraName):
+    assert srgb.illuminant_spd(spectraName, [560.0])[0] == pytest.approx(100.0)
+
+
+def test_NeutralReflectances():
+    wavelengths = np.linspace(400, 700, 10)
+    pixels = np.stack([np.full((2, 2, 10), value, dtype=np.float32) for value in (0.0, 18.0, 100.0)])
+    rgb = srgb.spectral_to_srgb(pixels.reshape(6, 2, 10), wavelengths)
+    assert rgb.dtype == np.uint8
+    # D65 is the sRGB white point, so grey reflectors render neutral
+    np.testing.assert_array_equal(rgb[:2], 0)
+    assert np.ptp(rgb[2:4].astype(int), axis=-1).max() <= 2
+    np.testing.assert_array_equal(rgb[4:], 255)
+
+
+def test_ProjectionMatrixMatchesPixelwiseIntegration():
+    wavelengths = np.array([405.0, 450.0, 520.0, 590.0, 660.0])
+    reflectance = np.array([10.0, 20.0, 40.0, 30.0, 50.0])
+    matrix = srgb.projection_matrix(wavelengths)
+
+    grid = np.arange(380.0, 781.0)
+    weights = srgb.illuminant_spd("D65", grid)[:, None] * srgb.color_matching_functions(grid)
+    xyz = (np.interp(grid, wavelengths, reflectance) / 100) @ weights / weights[:, 1].sum()
+    np.testing.assert_allclose(reflectance @ matrix, srgb._XYZ_TO_SRGB @ xyz, rtol=1e-5)
+
+
+def test_UnknownSpectraName():
+    with pytest.raises(NotImplementedError):
+        srgb.projection_matrix([450.0, 550.0, 650.0], "NotAnIlluminant")
+
+
+def test_ImageClassToSRGB(monkeypatch):
+    from videometer import config, hips
+    monkeypatch.setattr(config, "_BACKEND", "python")
+    img = hips.read(os.path.join(testImagesDir, "calibratedImage.hips"))
+    rgb = img.to_sRGB(spectraName="D65")
+    assert rgb.shape == (3, 3, 3)
+    assert rgb.dtype == np.uint8
+    assert np.all(rgb == img.RGBPixels)
+
+    # Rendering of the clr backend's SrgbViewTransform (see test_main.test_to_sRGB). With
+    # the tabulated CIE functions red matches; the clr transform renders slightly warmer,
+    # which leaves green and blue a few levels apart.
+    clr_expected = np.array([[[181, 139, 83], [178, 136, 86], [158, 121, 78]],
+                             [[180, 139, 85], [175, 135, 86], [148, 115, 77]],
+                             [[180, 138, 86], [170, 131, 84], [131, 103, 74]]])
+    difference = np.abs(rgb.astype(int) - clr_expected).max(axis=(0, 1))
+    assert np.all(difference <= [1, 5, 13])
+
+
+def test_ProjectionMatrixCache(tmp_path, monkeypatch):
+    # A fresh in-memory cache and no disk cache; monkeypatch restores both afterwards
+    monkeypatch.setattr(srgb, "_cache_dir", None)
+    monkeypatch.setattr(srgb, "_cached_projection_matrix",
+                        functools.lru_cache(maxsize=srgb._CACHE_SIZE)(srgb._cached_projection_matrix.__wrapped__))
+    wavelengths = np.array([405.0, 450.0, 520.0, 590.0, 660.0])
+    matrix = srgb.projection_matrix(wavelengths)
+    assert srgb.projection_matrix(list(wavelengths)) is matrix
+    assert srgb.projection_matrix(wavelengths, "A") is not matrix
+    assert not matrix.flags.writeable
+
+    # On-disk cache: written on the first computation and loaded by a fresh process
+    srgb.set_cache_dir(str(tmp_path / "cache"))
+    srgb.clear_cache()
+    computed = srgb.projection_matrix(wavelengths)
+    assert len(os.listdir(tmp_path / "cache")) == 1
+    srgb.clear_cache()
+    monkeypatch.setattr(srgb, "_compute_projection_matrix", None)
+    loaded = srgb.projection_matrix(wavelengths)
+    np.testing.assert_array_equal(loaded, computed)
+    assert not loaded.flags.writeable
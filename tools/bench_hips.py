@@ -0,0 +1,136 @@
+"""Micro-benchmarks for the pure-Python HIPS reader/writer (``videometer.hips_core``).
+
+Each sub-command times one part of the I/O path on real files and prints throughput, so
+changes to the reader/writer can be compared before and after on the same data.
+
+Usage::
+
+    python tools/bench_hips.py header tests/TestImages TestData      # header parse files/s
+    python tools/bench_hips.py header /mnt/share/images --repeat 1
+    python tools/bench_hips.py write TestData/1c8f82ed-2ede-48c7-a0be-4978f282a6ea.hips
+    python tools/bench_hips.py quantize tests/TestImages TestData    # fixed vs fitted ranges
+
+Directories are searched recursively for ``*.hips`` files.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# tools/bench_hips.py -> repo root is the parent of tools/
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from videometer.hips_core import COMPRESSION_PROFILES, HipsImage  # noqa: E402
+
+
+def _collect(paths):
+    files = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(p.rglob("*.hips")))
+        else:
+            files.append(p)
+    if not files:
+        sys.exit("No .hips files found.")
+    return [str(f) for f in files]
+
+
+def _bench_header(args):
+    files = _collect(args.paths)
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for path in files:
+            HipsImage.read_header(path)
+        best = min(best, time.perf_counter() - start)
+    print(f"{len(files)} files, best of {args.repeat}: {best * 1e3:.1f} ms "
+          f"({len(files) / best:,.0f} files/s)")
+
+
+def _bench_write(args):
+    files = _collect(args.paths)
+    cubes = [HipsImage.read(path).pixels.astype("float32") for path in files]
+    cube_bytes = sum(cube.nbytes for cube in cubes)
+    print(f"{len(files)} files, {cube_bytes / 1e6:.1f} MB of float32 pixels\n")
+    print("| Preset | Profile | Write MB/s | Ratio |")
+    print("|---|---|---:|---:|")
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.hips")
+        for preset in args.presets:
+            for profile in [None] + list(COMPRESSION_PROFILES):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    size = 0
+                    start = time.perf_counter()
+                    for cube in cubes:
+                        image = HipsImage()
+                        image.pixels = cube
+                        image.write(out, preset, profile=profile)
+                        size += os.path.getsize(out)
+                    best = min(best, time.perf_counter() - start)
+                print(f"| {preset} | {profile or 'default'} | {cube_bytes / best / 1e6:.1f} "
+                      f"| {cube_bytes / size:.2f} |")
+
+
+def _bench_quantize(args):
+    files = _collect(args.paths)
+    cubes = [HipsImage.read(path).pixels.astype("float32") * np.float32(args.scale) for path in files]
+    cube_bytes = sum(cube.nbytes for cube in cubes)
+    print(f"{len(files)} files, {cube_bytes / 1e6:.1f} MB of float32 pixels\n")
+    print("| Preset | Range | Size (kB) | RMSE | Max error |")
+    print("|---|---|---:|---:|---:|")
+    ranges = [("preset", None), ("min/max", True), ("p0.1-p99.9", (0.1, 99.9))]
+    for preset in args.presets:
+        for label, auto_range in ranges:
+            size = 0
+            squared_error = 0.0
+            max_error = 0.0
+            for cube in cubes:
+                image = HipsImage()
+                image.pixels = cube
+                data = image.to_bytes(preset, auto_range=auto_range)
+                size += len(data)
+                error = HipsImage.from_buffer(data).pixels.astype("float64") - cube
+                squared_error += float(np.square(error).sum())
+                max_error = max(max_error, float(np.abs(error).max()))
+            rmse = (squared_error / (cube_bytes / 4)) ** 0.5
+            print(f"| {preset} | {label} | {size / 1e3:.1f} | {rmse:.4f} | {max_error:.4f} |")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("header", help="Time HipsImage.read_header over a set of files")
+    p.add_argument("paths", nargs="+", help="HIPS files or directories")
+    p.add_argument("--repeat", type=int, default=5, help="Number of timed passes (default: 5)")
+    p.set_defaults(func=_bench_header)
+
+    p = sub.add_parser("write", help="Time HipsImage.write per preset and compression profile")
+    p.add_argument("paths", nargs="+", help="HIPS files or directories whose pixels are written")
+    p.add_argument("--presets", nargs="+", default=["VeryHighQuality", "HighQuality", "HighCompression"],
+                   help="Compression presets to time (default: the PNG presets)")
+    p.add_argument("--repeat", type=int, default=3, help="Number of timed passes (default: 3)")
+    p.set_defaults(func=_bench_write)
+
+    p = sub.add_parser("quantize", help="Compare fixed and fitted (auto_range) quantization ranges")
+    p.add_argument("paths", nargs="+", help="HIPS files or directories whose pixels are written")
+    p.add_argument("--presets", nargs="+", default=["VeryHighQuality", "HighQuality", "HighCompression"],
+                   help="Quantized compression presets to compare (default: the PNG presets)")
+    p.add_argument("--scale", type=float, default=1.0,
+                   help="Multiply the pixels by this factor first, e.g. 0.05 to mimic dim bands")
+    p.set_defaults(func=_bench_quantize)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()